@@ -1,21 +1,31 @@
+import time
+STARTED = time.perf_counter()  # Startup marks are measured from here, before the Qt imports
 import sys
 import os
 import json
-import re
-import winreg as reg
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QSlider, QLabel, QHBoxLayout,
-                             QProgressBar, QPushButton, QMenu, QAction, QSystemTrayIcon, QSizePolicy)
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QIcon
-from pycaw.pycaw import AudioUtilities, ISimpleAudioVolume, IAudioMeterInformation
+import logging
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QMenu, QAction, QSystemTrayIcon, QLabel, QShortcut
+from PyQt5.QtCore import Qt, QTimer, QEvent
+from PyQt5.QtGui import QIcon, QKeySequence
+from faults import log
+from perf import profiler
+from program_list import ProgramListModel, ProgramListView
+import theme
 
 class VolumeMixer(QWidget):
     def __init__(self):
         super().__init__()
         self.settings_file = 'settings.json'
+        self.app_state_file = 'app_state.json'  # Per-program volume and mute, kept by the worker
+        self.perf_report_file = 'perf_report.json'
+        self.settings = {}
+        self.meter_rate = 30  # Meter frames per second, 30-60
+        self.discovery_interval = 1000  # Session discovery cadence in ms
+        self.startup_marks = {}  # stage -> ms since STARTED
+        self.worker = None
+        self.control_server = None
         self.initUI()
         self.load_settings()  # Load settings when initializing
-        self.add_to_startup()
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setIcon(QIcon('icon.png'))
         self.tray_icon.setToolTip('Volume Mixer')
@@ -26,20 +36,104 @@ class VolumeMixer(QWidget):
         self.restore_action.triggered.connect(self.show)
         self.quit_action = QAction('Quit')
         self.quit_action.triggered.connect(self.close)
+        self.perf_overlay_action = QAction('Performance Overlay')
+        self.perf_overlay_action.setCheckable(True)
+        self.perf_overlay_action.toggled.connect(self.show_perf_overlay)
+        self.perf_report_action = QAction('Save Performance Report')
+        self.perf_report_action.triggered.connect(self.save_perf_report)
 
         self.tray_menu.addAction(self.restore_action)
+        self.tray_menu.addAction(self.perf_overlay_action)
+        self.tray_menu.addAction(self.perf_report_action)
         self.tray_menu.addAction(self.quit_action)
         self.tray_icon.setContextMenu(self.tray_menu)
-
-        self.programs = {}
-        self.sliders = {}
-        self.level_bars = {}
-        self.mute_buttons = {}
-        self.process_ids = set()
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_levels)
-        self.timer.start(1000)  # Update every second
         self.drag_start_position = None
+        if self.settings.get('profiling'):
+            profiler.enabled = True
+
+        # Everything else waits until the window has painted; see start_services
+        self.program_list.viewport().installEventFilter(self)
+        QTimer.singleShot(250, self.start_services)  # In case it never paints, e.g. started hidden
+
+    def start_services(self):
+        """Second startup stage, run from the event loop once the window has painted."""
+        if self.worker is not None:
+            return
+        from app_rules import AppRules
+        from app_state import AppStateStore
+        from audio_backend import create_backend
+        from audio_worker import AudioWorker
+        from control_server import ControlServer
+
+        # All audio I/O happens on the worker; the GUI only renders its snapshots.
+        # The backend is created there too, so pycaw and comtypes load off this thread.
+        backend_name = self.settings.get('audio_backend')
+        self.worker = AudioWorker(lambda: create_backend(backend_name),
+                                  AppRules.from_settings(self.settings),
+                                  self.meter_rate, self.discovery_interval,
+                                  AppStateStore(self.app_state_file))
+        self.worker.programs_added.connect(self.add_programs)
+        self.worker.programs_removed.connect(self.remove_programs)
+        self.worker.volumes_changed.connect(self.update_levels)
+        self.worker.mute_changed.connect(self.update_mute_button)
+        self.worker.meters_sampled.connect(self.update_meters)
+        self.worker.start()
+        self.mark_startup('audio_started')
+        self.report_visibility()
+
+        # Scripts drive the mixer through a local socket, e.g. for stream automation
+        self.control_server = ControlServer(self)
+        control_server_name = self.settings.get('control_server', 'VolumeMixer')
+        if control_server_name:
+            self.control_server.listen(control_server_name)
+        self.add_to_startup()
+
+    def mark_startup(self, stage):
+        if stage in self.startup_marks:
+            return
+        self.startup_marks[stage] = (time.perf_counter() - STARTED) * 1000
+        if stage == 'first_row':
+            log.debug("startup " + " ".join(f"{name}_ms={ms:.1f}" for name, ms in self.startup_marks.items()))
+
+    def paintEvent(self, event):
+        if 'first_paint' not in self.startup_marks:
+            self.mark_startup('first_paint')
+            QTimer.singleShot(0, self.start_services)
+        super().paintEvent(event)
+
+    def eventFilter(self, watched, event):
+        # The first paint of the list with a program in it is the first populated row
+        if event.type() == QEvent.Paint and self.program_model.programs:
+            self.mark_startup('first_row')
+            watched.removeEventFilter(self)
+        return False
+
+    def report_visibility(self):
+        # The worker stops sampling meters nobody can see and slows discovery down
+        if self.worker is None:
+            return
+        if self.isMinimized():
+            state = 'minimized'
+        elif self.isVisible():
+            state = 'shown'
+        elif self.tray_icon.isVisible():
+            state = 'tray'
+        else:
+            state = 'hidden'
+        self.worker.submit('set_visibility', state)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.report_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.report_visibility()
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.report_visibility()
+        super().changeEvent(event)
 
     def initUI(self):
         self.setWindowFlags(Qt.Window | Qt.FramelessWindowHint)
@@ -51,11 +145,25 @@ class VolumeMixer(QWidget):
         layout.setSpacing(0)  # Remove spacing between widgets in the main layout
         self.setLayout(layout)
 
-        # Create the program list layout
-        self.program_list_layout = QVBoxLayout()
-        self.program_list_layout.setSpacing(0)  # No spacing between items in the program list
-        self.program_list_layout.setContentsMargins(0, 0, 0, 0)  # No margins for compact layout
-        layout.addLayout(self.program_list_layout)
+        # Create the program list; rows are painted, so only visible ones cost anything
+        self.program_model = ProgramListModel(self)
+        self.program_list = ProgramListView()
+        self.program_list.setModel(self.program_model)
+        self.program_list.volume_changed.connect(self.set_volume)
+        self.program_list.volume_committed.connect(self.commit_volume)
+        self.program_list.mute_clicked.connect(self.toggle_mute)
+        layout.addWidget(self.program_list, 0, Qt.AlignTop)
+
+        # Debug overlay with per-phase timings and counters, toggled with F12
+        self.perf_overlay = QLabel()
+        self.perf_overlay.setObjectName('perfOverlay')
+        self.perf_overlay.setTextFormat(Qt.PlainText)
+        self.perf_overlay.hide()
+        layout.addWidget(self.perf_overlay)
+        self.perf_timer = QTimer(self)
+        self.perf_timer.setInterval(500)
+        self.perf_timer.timeout.connect(self.update_perf_overlay)
+        QShortcut(QKeySequence(Qt.Key_F12), self, lambda: self.perf_overlay_action.toggle())
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -71,232 +179,79 @@ class VolumeMixer(QWidget):
         self.drag_start_position = None
 
     def set_volume(self, program_name, value):
-        try:
-            if program_name in self.programs:
-                volume = self.programs[program_name]['volume']
-                volume.SetMasterVolume(value / 100, None)
-                if value > 0:
-                    self.mute_buttons[program_name].setStyleSheet("background-color: #555555; color: white; border-radius: 15px;")
-        except Exception as e:
-            print(f"Error setting volume for {program_name}: {e}")
+        if program_name in self.program_model.rows:
+            self.worker.submit('set_volume', program_name, value)  # Coalesced by the worker
+            if value > 0:
+                self.program_model.set_muted(program_name, False)
 
-    def toggle_mute(self, program_name):
-        try:
-            if program_name in self.programs:
-                volume = self.programs[program_name]['volume']
-                current_volume = volume.GetMasterVolume()
-                if current_volume > 0:
-                    self.programs[program_name]['last_volume'] = current_volume
-                    volume.SetMasterVolume(0, None)
-                    self.mute_buttons[program_name].setStyleSheet("background-color: red; color: white; border-radius: 15px;")
-                else:
-                    last_volume = self.programs[program_name].get('last_volume', 1)
-                    volume.SetMasterVolume(last_volume, None)
-                    self.mute_buttons[program_name].setStyleSheet("background-color: #555555; color: white; border-radius: 15px;")
-        except Exception as e:
-            print(f"Error toggling mute for {program_name}: {e}")
+    def commit_volume(self, program_name, value):
+        if program_name in self.program_model.rows:
+            self.worker.submit('commit_volume', program_name, value)
 
-    def update_levels(self):
-        try:
-            sessions = AudioUtilities.GetAllSessions()
-            current_process_ids = set()
-            new_programs = []
-            exclude_processes = [
-                'audiodg.exe', 'explorer.exe', 'SndVol.exe', 'SearchUI.exe',
-                'svchost.exe', 'avastUI.exe', 'avgui.exe', 'OneDrive.exe',
-                'Dropbox.exe', 'googledrivesync.exe','SteelSeriesSonar.exe',
-                'SteelSeriesEngine.exe', 'SteelSeriesPrism.exe', 'steelseriessonar.exe',
-                'steam.exe'
-            ]
-            media_players = {
-                'vlc.exe': 'VLC',
-                'wmplayer.exe': 'Windows Media Player',
-                'iTunes.exe': 'iTunes',
-                'potplayer.exe': 'PotPlayer',
-                'mpc-hc.exe': 'Media Player',
-                'zoom.exe': 'Zoom',
-                'Zoom.exe': 'Zoom',
-                'zoommeeting.exe': 'Zoom',
-                'MicrosoftEdge.exe': 'Edge',
-                'Teams.exe': 'Microsoft Teams',
-                'Word.exe': 'Microsoft Word',
-                'Excel.exe': 'Microsoft Excel',
-                'PowerPoint.exe': 'PowerPoint',
-                'whatsapp.exe': 'WhatsApp',
-                'whatsappvoip.exe': 'WhatsApp',
-                'steamwebhelper.exe': 'Steam',
-                'discord.exe': 'Discord',
-                'opera.exe': 'Opera',
-                'zWebview2Agent': 'Zoom'
-            }
-
-            process_map = {}
-
-            for session in sessions:
-                if session.Process:
-                    process_name = session.Process.name().lower()
-                    process_id = session.Process.pid
-
-                    # Skip excluded processes
-                    if process_name in exclude_processes:
-                        continue
-
-                    main_program_name = media_players.get(process_name, process_name)
-                    cleaned_name = re.split(r'[.,()]', main_program_name)[0].strip()
-
-                    if cleaned_name not in process_map:
-                        process_map[cleaned_name] = set()
-
-                    process_map[cleaned_name].add(process_id)
-                    current_process_ids.add(process_id)
-
-                    if cleaned_name not in self.programs:
-                        display_name = media_players.get(cleaned_name, cleaned_name)
-                        volume = session._ctl.QueryInterface(ISimpleAudioVolume)
-                        audio_meter = session._ctl.QueryInterface(IAudioMeterInformation)
-                        self.programs[display_name] = {'volume': volume, 'meter': audio_meter}
-
-                        hbox = QHBoxLayout()
-                        hbox.setSpacing(0)
-                        hbox.setContentsMargins(5, 5, 5, 5)
-
-                        label = QLabel(display_name)
-                        label.setFixedSize(120, 30)
-                        label.setWordWrap(True)
-                        label.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-                        label.setStyleSheet("""
-                            QLabel {
-                                background-color: #333333;
-                                color: #FFFFFF;
-                                padding: 5px;
-                                border-radius: 5px;
-                                font-weight: bold;
-                                font-size: 15px;
-                            }
-                        """)
-                        hbox.addWidget(label)
-
-                        mute_button = QPushButton("M")
-                        mute_button.setFixedSize(30, 30)
-                        mute_button.setStyleSheet("background-color: #666666; color: white; border-radius: 15px;")
-                        mute_button.clicked.connect(lambda value, name=display_name: self.toggle_mute(name))
-                        self.mute_buttons[display_name] = mute_button
-
-                        hbox.addWidget(mute_button)
-
-                        slider = QSlider(Qt.Horizontal)
-                        slider.setMinimum(0)
-                        slider.setMaximum(100)
-                        slider.setValue(int(volume.GetMasterVolume() * 100))
-                        slider.valueChanged.connect(lambda value, name=display_name: self.set_volume(name, value))
-                        self.sliders[display_name] = slider
-
-                        slider.setFixedSize(200, 30)
-                        slider.setStyleSheet("""
-                            QSlider::groove:horizontal {
-                                border: 1px solid #999999;
-                                height: 8px;
-                                background: #B0C4DE;
-                                margin: 2px 0;
-                            }
-                            QSlider::handle:horizontal {
-                                background: #FFFFFF;
-                                border: 1px solid #FFFFFF;
-                                width: 15px;
-                                margin: -2px 0;
-                                border-radius: 15px;
-                            }
-                        """)
-                        hbox.addWidget(slider)
-
-                        level_bar = QProgressBar()
-                        level_bar.setMinimum(0)
-                        level_bar.setMaximum(100)
-                        level_bar.setTextVisible(False)
-                        level_bar.setFixedSize(100, 30)
-                        level_bar.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-
-                        level_bar.setStyleSheet("""
-                            QProgressBar {
-                                border: 1px solid #999999;
-                                border-radius: 3px;
-                                background-color: rgba(224, 224, 224, 150);
-                                margin-left: 10px;
-                                margin-right: 10px;
-                            }
-                            QProgressBar::chunk {
-                                background-color: #66CDAA;
-                                width: 10px;
-                            }
-                        """)
-                        hbox.addWidget(level_bar)
-                        self.level_bars[display_name] = level_bar
-                        new_programs.append(hbox)
-
-            programs_to_remove = [program_name for program_name in self.programs if program_name not in process_map]
-
-            for program_name in programs_to_remove:
-                self.remove_program_from_ui(program_name)
-
-            for hbox in new_programs:
-                self.program_list_layout.addLayout(hbox)
-
-            self.process_ids = current_process_ids
-
-            for program_name in self.programs:
-                process_ids = process_map.get(program_name, set())
-                program_volume = self.programs[program_name]['volume']
-                program_meter = self.programs[program_name]['meter']
-
-                if not process_ids:
-                    continue
-
-                process_ids = list(process_ids)
-                session_volume = program_volume.GetMasterVolume()
-                session_meter = program_meter.GetPeakValue() * 100
-
-                self.sliders[program_name].setValue(int(session_volume * 100))
-                self.level_bars[program_name].setValue(int(session_meter))
-        except Exception as e:
-            print(f"Error updating levels: {e}")
+    def fade(self, program_name, value, duration_ms, curve='linear'):
+        if program_name in self.program_model.rows:
+            self.worker.submit('fade', program_name, value, duration_ms, curve)  # The sliders follow on volumes_changed
+            if value > 0:
+                self.program_model.set_muted(program_name, False)
 
-    def remove_program_from_ui(self, program_name):
+    def cancel_fade(self, program_name):
+        if program_name in self.program_model.rows:
+            self.worker.submit('cancel_fade', program_name)
+
+    def toggle_mute(self, program_name):
+        if program_name in self.program_model.rows:
+            self.worker.submit('toggle_mute', program_name)
+
+    def set_mute(self, program_name, muted):
+        if program_name in self.program_model.rows:
+            self.worker.submit('set_mute', program_name, muted)
+
+    def update_mute_button(self, program_name, muted):
+        self.program_model.set_muted(program_name, muted)
+
+    def add_programs(self, programs):
+        with profiler.phase('gui_programs'):
+            self.program_model.add_programs(programs)
+
+    def remove_programs(self, program_names):
+        with profiler.phase('gui_programs'):
+            self.program_model.remove_programs(program_names)
+
+    def update_levels(self, volumes):
+        # Never pull a slider out from under the user
+        with profiler.phase('gui_levels'):
+            self.program_model.set_volumes(volumes, skip=self.program_list.dragging)
+
+    def update_meters(self, frame):
+        with profiler.phase('gui_meters'):
+            self.program_model.set_levels(frame)
+
+    def show_perf_overlay(self, shown):
+        # Showing the overlay turns profiling on; it stays on for later reports
+        if shown:
+            profiler.enabled = True
+            self.update_perf_overlay()
+            self.perf_timer.start()
+        else:
+            self.perf_timer.stop()
+        self.perf_overlay.setVisible(shown)
+        self.adjustSize()
+
+    def update_perf_overlay(self):
+        self.perf_overlay.setText('\n'.join(profiler.report()))
+
+    def save_perf_report(self):
         try:
-            # Iterate over the items in the program_list_layout
-            for i in range(self.program_list_layout.count()):
-                item = self.program_list_layout.itemAt(i)
-                if item:
-                    layout = item.layout()
-                    if layout and layout.count() > 0:
-                        label = layout.itemAt(0).widget()
-                        if label and label.text() == program_name:
-                            # Remove widgets in the layout
-                            label.deleteLater()
-                            slider = layout.itemAt(1).widget()
-                            if slider:
-                                slider.deleteLater()
-                            mute_button = layout.itemAt(2).widget()
-                            if mute_button:
-                                mute_button.deleteLater()
-                            level_bar = layout.itemAt(3).widget()
-                            if level_bar:
-                                level_bar.deleteLater()
-                            layout.deleteLater()
-                            if program_name in self.programs:
-                                del self.programs[program_name]
-                            if program_name in self.sliders:
-                                del self.sliders[program_name]
-                            if program_name in self.mute_buttons:
-                                del self.mute_buttons[program_name]
-                            if program_name in self.level_bars:
-                                del self.level_bars[program_name]
-                            break
+            profiler.dump(self.perf_report_file)
+            print(f"Performance report saved to {os.path.abspath(self.perf_report_file)}")
         except Exception as e:
-            print(f"Error removing program from UI: {e}")
-
+            print(f"Error saving performance report: {e}")
 
     def add_to_startup(self):
+        if sys.platform != 'win32':
+            return
         try:
+            import winreg as reg
             key = r'SOFTWARE\Microsoft\Windows\CurrentVersion\Run'
             value = 'VolumeMixer'
             reg_key = reg.OpenKey(reg.HKEY_CURRENT_USER, key, 0, reg.KEY_SET_VALUE)
@@ -306,14 +261,18 @@ class VolumeMixer(QWidget):
             print(f"Error adding to startup: {e}")
 
     def closeEvent(self, event):
+        if self.control_server is not None:
+            self.control_server.close()
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker.wait(2000)
         self.save_settings()  # Save settings before closing
         super().closeEvent(event)
 
     def save_settings(self):
         try:
-            settings = {
-                'geometry': self.saveGeometry().data().decode('latin1')  # Convert QByteArray to string
-            }
+            settings = dict(self.settings)  # Keep keys this method doesn't own
+            settings['geometry'] = self.saveGeometry().data().decode('latin1')  # Convert QByteArray to string
             with open(self.settings_file, 'w') as f:
                 json.dump(settings, f)
             print("Settings saved:", settings)
@@ -325,6 +284,13 @@ class VolumeMixer(QWidget):
             if os.path.exists(self.settings_file):
                 with open(self.settings_file, 'r') as f:
                     settings = json.load(f)
+                    self.settings = settings
+                    meter_rate = settings.get('meter_rate')
+                    if meter_rate:
+                        self.meter_rate = min(max(int(meter_rate), 30), 60)
+                    discovery_interval = settings.get('discovery_interval')
+                    if discovery_interval:
+                        self.discovery_interval = int(discovery_interval)
                     geometry = settings.get('geometry')
                     if geometry:
                         self.restoreGeometry(bytes(geometry, 'latin1'))  # Convert string to QByteArray
@@ -333,7 +299,9 @@ class VolumeMixer(QWidget):
             print(f"Error loading settings: {e}")
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
     app = QApplication(sys.argv)
+    theme.install(app)
     mixer = VolumeMixer()
     mixer.show()
     sys.exit(app.exec_())
@@ -0,0 +1,125 @@
+import fnmatch
+import re
+
+from faults import log
+
+DEFAULT_EXCLUDED = [
+    'audiodg.exe', 'explorer.exe', 'SndVol.exe', 'SearchUI.exe',
+    'svchost.exe', 'avastUI.exe', 'avgui.exe', 'OneDrive.exe',
+    'Dropbox.exe', 'googledrivesync.exe', 'SteelSeriesSonar.exe',
+    'SteelSeriesEngine.exe', 'SteelSeriesPrism.exe',
+    'steam.exe'
+]
+DEFAULT_NAMES = {
+    'vlc.exe': 'VLC',
+    'wmplayer.exe': 'Windows Media Player',
+    'iTunes.exe': 'iTunes',
+    'potplayer.exe': 'PotPlayer',
+    'mpc-hc.exe': 'Media Player',
+    'MicrosoftEdge.exe': 'Edge',
+    'Teams.exe': 'Microsoft Teams',
+    'Word.exe': 'Microsoft Word',
+    'Excel.exe': 'Microsoft Excel',
+    'PowerPoint.exe': 'PowerPoint',
+    'steamwebhelper.exe': 'Steam',
+    'discord.exe': 'Discord',
+    'opera.exe': 'Opera',
+}
+DEFAULT_GROUPS = {
+    'Zoom': ['zoom.exe', 'zoommeeting.exe', 'zWebview2Agent'],
+    'WhatsApp': ['whatsapp.exe', 'whatsappvoip.exe'],
+}
+
+_EXCLUDED = object()
+
+
+class AppRules:
+    """Decides which program a process belongs to, or that it is hidden.
+
+    Rules are process names matched case-insensitively. A plain name is an
+    exact match, a name containing * ? or [ is a glob, and 're:' starts a
+    regular expression. A rule without an extension also matches the bare
+    name, so 'zWebview2Agent' matches 'zwebview2agent.exe'. Exact rules win
+    over patterns and earlier rules over later ones, exclusions coming first.
+    A process without a rule of its own is classified by the application it
+    belongs to (see ProcessCache.application), so a browser renderer or a
+    WebView2 helper shows up as the program that started it. Processes
+    without any rule are shown under their name minus the extension.
+
+    Exact rules go into one dict and each pattern is compiled on its own, so
+    inline flags and backreferences behave as they would alone; a pattern
+    that does not compile is logged and skipped. Every answer is memoised
+    per process name, so the patterns are tried once per name.
+    """
+
+    def __init__(self, excluded=(), names=None, groups=None):
+        rules = [(rule, _EXCLUDED) for rule in excluded]
+        rules += list((names or {}).items())
+        for program_name, members in (groups or {}).items():
+            rules += [(rule, program_name) for rule in members]
+
+        self._exact = {}
+        self._patterns = []  # [(compiled pattern, result)] in rule order
+        for rule, result in rules:
+            if rule.startswith('re:'):
+                pattern = rule[3:]
+            elif any(c in rule for c in '*?['):
+                pattern = fnmatch.translate(rule)
+            else:
+                self._exact.setdefault(rule.casefold(), result)
+                continue
+            try:
+                self._patterns.append((re.compile(pattern, re.IGNORECASE), result))
+            except re.error as e:
+                log.error("invalid_program_rule rule=%r detail=%s", rule, e)
+        self._cache = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Rules from settings.json, checked before the built-in defaults."""
+        names = dict(settings.get('program_names', {}))
+        for rule, program_name in DEFAULT_NAMES.items():
+            names.setdefault(rule, program_name)
+        groups = dict(DEFAULT_GROUPS)
+        groups.update(settings.get('program_groups', {}))
+        return cls(list(settings.get('excluded_programs', [])) + DEFAULT_EXCLUDED, names, groups)
+
+    def program_name(self, process_name, app_name=None):
+        """Program name for a process name, or None if it should not be shown.
+
+        app_name is the process name of the application the process belongs
+        to, when that is a different process.
+        """
+        if app_name == process_name:
+            app_name = None
+        key = process_name if app_name is None else (process_name, app_name)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        name = process_name.casefold()
+        result = self._match(name)
+        if result is None and app_name is not None:
+            name = app_name.casefold()
+            result = self._match(name)
+        if result is _EXCLUDED:
+            result = None
+        elif result is None:
+            result = self._stem(name)
+        self._cache[key] = result
+        return result
+
+    @staticmethod
+    def _stem(name):
+        return re.split(r'[.,()]', name)[0].strip()
+
+    def _match(self, name):
+        """The first rule's result for a casefolded name, or None if no rule matches."""
+        result = self._exact.get(name)
+        if result is None:
+            result = self._exact.get(self._stem(name))
+        if result is None:
+            for pattern, pattern_result in self._patterns:
+                if pattern.fullmatch(name) is not None:
+                    return pattern_result
+        return result
@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+import time
+
+from faults import RateLimitedLog, log
+
+
+class AppStateStore:
+    """Remembers each program's volume and mute state across runs.
+
+    Lookups are a dict hit. Changes only mark the store dirty; flush() writes
+    the file once changes have been quiet for `delay` seconds, or `max_delay`
+    after the first unsaved one, through a temp file renamed over the old file
+    so a crash never leaves half of it behind.
+    """
+
+    def __init__(self, path, delay=2.0, max_delay=10.0, errors=None):
+        self.path = path
+        self.errors = errors or RateLimitedLog()  # A disk that keeps failing is reported once a minute
+        self.delay = delay
+        self.max_delay = max_delay
+        self.states = {}  # program name -> {'volume': 0..1, 'muted': bool, 'last_volume': 0..1 or None}
+        self.saves = 0
+        self._first_change = None
+        self._last_change = None
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.states = json.load(f)
+        except Exception as e:
+            log.error("app_state_load_failed path=%s error=%s detail=%s", self.path, type(e).__name__, e)
+
+    def get(self, program_name):
+        return self.states.get(program_name)
+
+    def remember(self, program_name, volume, muted, last_volume, now=None):
+        volume = round(volume, 4)
+        state = {'volume': volume, 'muted': muted and volume == 0, 'last_volume': last_volume}
+        if self.states.get(program_name) == state:
+            return
+        self.states[program_name] = state
+        if now is None:
+            now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        self._last_change = now
+
+    @property
+    def deadline(self):
+        """When the unsaved changes are due to be written, or None if there are none."""
+        if self._first_change is None:
+            return None
+        return min(self._last_change + self.delay, self._first_change + self.max_delay)
+
+    def flush(self, now=None, force=False):
+        """Save if there are unsaved changes and they are due; returns True if it saved."""
+        due = self.deadline
+        if due is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        if now < due and not force:
+            return False
+        self._first_change = self._last_change = None
+        self.save()
+        return True
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.app_state-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self.states, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self.saves += 1
+        except Exception as e:
+            self.errors.warning('app_state_save_failed', self.path, error=type(e).__name__, detail=e)
+
+
+if __name__ == '__main__':
+    # Scripted session: a 5 s drag at 60 Hz, a pause, a mute, then a second drag, flushed once a second
+    with tempfile.TemporaryDirectory() as directory:
+        store = AppStateStore(os.path.join(directory, 'app_state.json'))
+        changes = 0
+        t = 0.0
+        script = [(5.0, 'drag'), (4.0, None), (0.0, 'mute'), (3.0, None), (5.0, 'drag')]
+        for duration, action in script:
+            if action == 'mute':
+                store.remember('Spotify', 0.0, True, 0.5, now=t)
+                changes += 1
+            end = t + duration
+            while t < end:
+                if action == 'drag':
+                    store.remember('Spotify', (t % 1.0), False, None, now=t)
+                    changes += 1
+                if int(t * 60) % 60 == 0:
+                    store.flush(now=t)
+                t += 1 / 60
+        store.flush(now=t, force=True)
+        start = time.perf_counter()
+        for _ in range(100000):
+            store.get('Spotify')
+        lookup = (time.perf_counter() - start) / 100000
+        print(f"{changes} changes -> {store.saves} file writes, lookup {lookup * 1e9:.0f} ns")
@@ -0,0 +1,383 @@
+import math
+import random
+import sys
+import time
+from collections import Counter
+
+from audio_sessions import TrackedSession
+from faults import RateLimitedLog
+from perf import profiler
+
+
+class AudioBackend:
+    """Everything the mixer needs from an audio system.
+
+    start() reports sessions through four callbacks, which may be called
+    from any thread: on_created(TrackedSession), on_expired(key),
+    on_volume_changed(key, level, muted) for changes made outside the mixer
+    and on_state_changed(key, active) when a session starts or stops playing.
+    All other methods are called from the thread that called start().
+    """
+
+    api_calls = 0  # Calls into the audio system from the methods below, for perf.profiler
+
+    def start(self, on_created, on_expired, on_volume_changed, on_state_changed):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def release(self, session):
+        """Called once for every session, when it expires or before stop(); free what it holds now."""
+
+    def get_volume(self, session):
+        raise NotImplementedError
+
+    def set_volume(self, session, level):
+        raise NotImplementedError
+
+    def set_volumes(self, sessions, level):
+        """Set one level on several sessions, e.g. all sessions of a program."""
+        for session in sessions:
+            self.set_volume(session, level)
+
+    def get_mute(self, session):
+        raise NotImplementedError
+
+    def set_mute(self, session, muted):
+        raise NotImplementedError
+
+    def get_peak(self, session):
+        raise NotImplementedError
+
+
+def create_backend(name=None):
+    """Backend by settings name; pycaw on Windows and the simulation elsewhere by default."""
+    if name is None:
+        name = 'pycaw' if sys.platform == 'win32' else 'simulated'
+    if name == 'pycaw':
+        return PycawBackend()
+    if name == 'simulated':
+        backend = SimulatedBackend(clock=time.monotonic)
+        backend.populate(8)
+        return backend
+    raise ValueError(f"Unknown audio backend: {name}")
+
+
+class PycawBackend(AudioBackend):
+    """Windows Core Audio sessions through pycaw.
+
+    The session manager is enumerated once in start(); after that new sessions
+    arrive through IAudioSessionNotification and departures through each
+    session's IAudioSessionEvents state callback. OnSessionCreated is only
+    delivered when COM runs in the multithreaded apartment (see pycaw.magic),
+    so the backend must only be used from the thread that started it.
+    """
+
+    def __init__(self, processes=None, errors=None):
+        if processes is None:
+            from process_info import ProcessCache  # psutil is only needed alongside pycaw
+            processes = ProcessCache()
+        self.processes = processes
+        self.errors = errors or RateLimitedLog()
+        profiler.gauge('psutil_calls', lambda: self.processes.psutil_calls)
+        self._mgr = None
+        self._notification = None
+        self._sessions = {}
+        self._com_initialized = False
+        self.event_context = None  # Passed to every volume write so our own changes can be told apart
+
+    def start(self, on_created, on_expired, on_volume_changed, on_state_changed):
+        # comtypes reads this on first import; the thread gets its own MTA either way
+        sys.coinit_flags = 0
+        import comtypes
+        comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+        self._com_initialized = True
+
+        from ctypes import pointer
+        event_context = self.event_context = pointer(comtypes.GUID.create_new())
+
+        from pycaw.callbacks import AudioSessionEvents, AudioSessionNotification
+        from pycaw.constants import AudioSessionState
+        from pycaw.pycaw import (AudioUtilities, IAudioMeterInformation, IAudioSessionControl2,
+                                 ISimpleAudioVolume)
+        from pycaw.utils import AudioSession
+
+        class SessionEvents(AudioSessionEvents):
+            def __init__(self, key):
+                super().__init__()
+                self.key = key
+
+            def on_simple_volume_changed(self, new_volume, new_mute, changer):
+                # Same test as pycaw.magic._MagicGuidCompare: our own writes carry our GUID.
+                # A change made with a NULL context arrives as a NULL POINTER, which is falsy but not None.
+                if not changer or changer.contents != event_context.contents:
+                    on_volume_changed(self.key, new_volume, bool(new_mute))
+
+            def on_state_changed(self, new_state, new_state_id):
+                if new_state == 'Expired':
+                    on_expired(self.key)
+                else:
+                    on_state_changed(self.key, new_state == 'Active')
+
+            def on_session_disconnected(self, disconnect_reason, disconnect_reason_id):
+                on_expired(self.key)
+
+        class SessionNotification(AudioSessionNotification):
+            def on_session_created(self, new_session):
+                add(new_session)
+
+        def add(session, snapshot=None):
+            pid = key = process = None
+            created = False
+            try:
+                pid = session.ProcessId
+                if pid == 0:
+                    return  # system sounds have no process to attribute them to
+                with profiler.phase('process_lookup'):
+                    process = self.processes.acquire(pid, snapshot)
+                    if process is None:
+                        return
+                    app = self.processes.application(process, snapshot)
+                key = session.InstanceIdentifier
+                ctl = session._ctl
+                tracked = TrackedSession(key, pid, process.name,
+                                         ctl.QueryInterface(ISimpleAudioVolume),
+                                         ctl.QueryInterface(IAudioMeterInformation),
+                                         session, process, session.State == AudioSessionState.Active, app.name)
+                # Queue the creation before any state event can be delivered for it
+                on_created(tracked)
+                created = True
+                self._sessions[key] = session
+                session.register_notification(SessionEvents(key))
+            except Exception as e:
+                if created:
+                    # Without notifications it would never expire; the tracker's release frees the pid
+                    self._sessions.pop(key, None)
+                    on_expired(key)
+                elif process is not None:
+                    self.processes.release(pid)  # Or the pid stays trusted after it is reused
+                self.errors.warning('session_add_failed', key or pid, process=getattr(process, 'name', None),
+                                    error=type(e).__name__, detail=e)
+
+        self._mgr = AudioUtilities.GetAudioSessionManager()
+        if self._mgr is None:
+            return
+        self._notification = SessionNotification()
+        self._mgr.RegisterSessionNotification(self._notification)
+        # Enumerating is also what arms OnSessionCreated, so this happens exactly once.
+        # Every session is here at once, so their processes come from one bulk snapshot.
+        enumerator = self._mgr.GetSessionEnumerator()
+        count = enumerator.GetCount()
+        snapshot = self.processes.snapshot() if count else None
+        for i in range(count):
+            ctl = enumerator.GetSession(i)
+            if ctl is not None:
+                add(AudioSession(ctl.QueryInterface(IAudioSessionControl2)), snapshot)
+
+    def release(self, session):
+        self.processes.release(session.pid)
+        self._unregister(session.key)
+
+    def _unregister(self, key):
+        audio_session = self._sessions.pop(key, None)
+        if audio_session is not None:
+            try:
+                audio_session.unregister_notification()
+            except Exception as e:
+                self.errors.warning('session_release_failed', key, error=type(e).__name__, detail=e)
+            # pycaw keeps the callback after unregistering; drop it with the rest of the session
+            audio_session._callback = None
+            audio_session._ctl = None
+
+    def stop(self):
+        if self._mgr is not None and self._notification is not None:
+            self._mgr.UnregisterSessionNotification(self._notification)
+        for key in list(self._sessions):
+            self._unregister(key)
+        self._notification = None
+        self._mgr = None
+        if self._com_initialized:
+            import comtypes
+            comtypes.CoUninitialize()
+            self._com_initialized = False
+
+    def get_volume(self, session):
+        self.api_calls += 1
+        return session.volume.GetMasterVolume()
+
+    def set_volume(self, session, level):
+        self.api_calls += 1
+        session.volume.SetMasterVolume(level, self.event_context)
+
+    def set_volumes(self, sessions, level):
+        event_context = self.event_context
+        for session in sessions:
+            self.api_calls += 1
+            session.volume.SetMasterVolume(level, event_context)
+
+    def get_mute(self, session):
+        self.api_calls += 1
+        return bool(session.volume.GetMute())
+
+    def set_mute(self, session, muted):
+        self.api_calls += 1
+        session.volume.SetMute(int(muted), self.event_context)
+
+    def get_peak(self, session):
+        self.api_calls += 1
+        return session.meter.GetPeakValue()
+
+
+class SimulatedVolume:
+    def __init__(self, level, muted):
+        self.level = level
+        self.muted = muted
+
+
+class SimulatedBackend(AudioBackend):
+    """Deterministic in-memory audio system for headless runs, tests and benchmarks.
+
+    Sessions, churn and external volume changes are scripted by the caller.
+    Each session's meter is a signal, a function of the backend clock, and
+    all randomness comes from one seeded Random, so a script replays exactly.
+    The clock is advance()d by hand unless a real one is passed in.
+    """
+
+    NAMES = ['chrome.exe', 'firefox.exe', 'spotify.exe', 'discord.exe', 'teams.exe',
+             'vlc.exe', 'steamwebhelper.exe', 'obs64.exe', 'zoom.exe', 'game.exe']
+
+    def __init__(self, seed=0, clock=None):
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.now = 0.0
+        self.sessions = {}
+        self.volume_writes = 0
+        self.peak_reads = 0
+        self.faults = {}  # session key -> exception every call on that session raises
+        self.failed_calls = Counter()  # session key -> calls that raised
+        self._next_id = 0
+        self._on_created = None
+        self._on_expired = None
+        self._on_volume_changed = None
+        self._on_state_changed = None
+
+    def time(self):
+        return self.clock() if self.clock is not None else self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def start(self, on_created, on_expired, on_volume_changed, on_state_changed):
+        self._on_created = on_created
+        self._on_expired = on_expired
+        self._on_volume_changed = on_volume_changed
+        self._on_state_changed = on_state_changed
+        for session in list(self.sessions.values()):
+            on_created(session)
+
+    def stop(self):
+        self._on_created = None
+        self._on_expired = None
+        self._on_volume_changed = None
+        self._on_state_changed = None
+
+    def tone(self, level=None, frequency=None):
+        """A pulsing meter signal with seeded level, rate and phase."""
+        level = self.random.uniform(0.2, 1.0) if level is None else level
+        frequency = self.random.uniform(0.2, 2.0) if frequency is None else frequency
+        phase = self.random.uniform(0, math.pi)
+        return lambda t: level * abs(math.sin(2 * math.pi * frequency * t + phase))
+
+    @staticmethod
+    def silence(t):
+        return 0.0
+
+    def add_session(self, name, pid=None, volume=1.0, muted=False, signal=None, active=True, app_name=None):
+        self._next_id += 1
+        key = f'sim-{self._next_id}'
+        pid = 1000 + self._next_id if pid is None else pid
+        session = TrackedSession(key, pid, name.lower(), SimulatedVolume(volume, muted),
+                                 signal or self.tone(), active=active, app_name=app_name and app_name.lower())
+        self.sessions[key] = session
+        if self._on_created:
+            self._on_created(session)
+        return session
+
+    def expire_session(self, key):
+        if self.sessions.pop(key, None) is not None and self._on_expired:
+            self._on_expired(key)
+
+    def change_volume(self, key, level, muted=False):
+        """Another application changes a session's volume."""
+        session = self.sessions[key]
+        session.volume.level = level
+        session.volume.muted = muted
+        if self._on_volume_changed:
+            self._on_volume_changed(key, level, muted)
+
+    def set_active(self, key, active):
+        """A session starts or stops playing; once started, the tracker keeps session.active."""
+        if self._on_state_changed:
+            self._on_state_changed(key, active)
+        else:
+            self.sessions[key].active = active
+
+    def fail(self, key, error):
+        """Make every call on a session raise error, like a dead process or a stale COM pointer; None heals it."""
+        if error is None:
+            self.faults.pop(key, None)
+        else:
+            self.faults[key] = error
+
+    def _check(self, session):
+        error = self.faults.get(session.key)
+        if error is not None:
+            self.failed_calls[session.key] += 1
+            raise error
+
+    def populate(self, count, names=None):
+        names = names or self.NAMES
+        return [self.add_session(names[i % len(names)]) for i in range(count)]
+
+    def churn(self, count=1, names=None):
+        """Expire count random sessions and start as many new ones."""
+        names = names or self.NAMES
+        for key in self.random.sample(sorted(self.sessions), min(count, len(self.sessions))):
+            self.expire_session(key)
+        return [self.add_session(self.random.choice(names)) for _ in range(count)]
+
+    def get_volume(self, session):
+        self.api_calls += 1
+        if self.faults:
+            self._check(session)
+        return session.volume.level
+
+    def set_volume(self, session, level):
+        self.api_calls += 1
+        if self.faults:
+            self._check(session)
+        self.volume_writes += 1
+        session.volume.level = level
+
+    def get_mute(self, session):
+        self.api_calls += 1
+        if self.faults:
+            self._check(session)
+        return session.volume.muted
+
+    def set_mute(self, session, muted):
+        self.api_calls += 1
+        if self.faults:
+            self._check(session)
+        self.volume_writes += 1
+        session.volume.muted = bool(muted)
+
+    def get_peak(self, session):
+        self.api_calls += 1
+        if self.faults:
+            self._check(session)
+        self.peak_reads += 1
+        if session.volume.muted:
+            return 0.0
+        return session.meter(self.time()) * session.volume.level
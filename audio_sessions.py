@@ -0,0 +1,306 @@
+from collections import deque
+
+from perf import profiler
+
+
+class TrackedSession:
+    """One audio session as seen by the mixer, with its interfaces resolved once."""
+
+    def __init__(self, key, pid, name, volume, meter, handle=None, process=None, active=True, app_name=None):
+        self.key = key
+        self.pid = pid
+        self.name = name  # lowercased process name, e.g. 'spotify.exe'
+        self.app_name = app_name or name  # Process name of the application it belongs to, e.g. 'teams.exe'
+        # volume, meter and handle belong to the backend; only it calls into them
+        self.volume = volume
+        self.meter = meter
+        self.handle = handle
+        self.process = process  # process_info.ProcessInfo when the backend resolves one
+        self.active = active  # False while the session has no stream (AudioSessionStateInactive)
+
+    def close(self):
+        """Drop the backend's interfaces now rather than whenever the garbage collector gets to them."""
+        self.volume = None
+        self.meter = None
+        self.handle = None
+        self.process = None
+
+    def __repr__(self):
+        return f"<TrackedSession {self.name} pid={self.pid}>"
+
+
+class ProgramGroup:
+    """Every live session of one program, controlled as a unit.
+
+    Reads follow pycaw.magic.MagicApp: the group's volume is its loudest
+    session's, and it is muted if any session is. Writes go to all sessions
+    at once, and a session joining later is brought to the group's level.
+    Only active sessions have a meter worth reading.
+
+    With a faults.SessionGuard, every backend call is made per session: one
+    that raises is reported to the guard and left out, and sessions the
+    guard has quarantined are skipped, so the rest of the group carries on.
+    Without one, backend errors propagate.
+    """
+
+    def __init__(self, name, guard=None):
+        self.name = name
+        self.guard = guard
+        self.sessions = {}
+        self.level = None  # Last level the mixer set, None while Windows decides
+        self.last_volume = None  # Level to restore when unmuting
+        self.muted = False  # Muted from the mixer, which mutes by setting the level to 0
+
+    def add(self, session, backend):
+        self.sessions[session.key] = session
+        if self.level is not None:
+            self._write(backend, [session], self.level)
+
+    def remove(self, key):
+        """Drop a session; returns True when the group has none left."""
+        self.sessions.pop(key, None)
+        return not self.sessions
+
+    def _healthy(self):
+        guard = self.guard
+        if guard is None or not guard.failing:
+            return list(self.sessions.values())
+        return [session for session in self.sessions.values() if guard.allow(session.key)]
+
+    def _read(self, operation, read):
+        """read(session) for every healthy session; the values of those that did not fail."""
+        if self.guard is None:
+            return [read(session) for session in self.sessions.values()]
+        values = []
+        for session in self._healthy():
+            try:
+                values.append(read(session))
+            except Exception as e:
+                self.guard.failed(session, operation, e)
+                continue
+            if session.key in self.guard.failing:
+                self.guard.succeeded(session.key)
+        return values
+
+    def _write(self, backend, sessions, level):
+        if self.guard is None:
+            backend.set_volumes(sessions, level)
+            return
+        sessions = [session for session in sessions if session.key not in self.guard.failing
+                    or self.guard.allow(session.key)]
+        try:
+            backend.set_volumes(sessions, level)
+            return
+        except Exception:
+            pass
+        # Setting a level twice is harmless, so find the culprit one session at a time
+        for session in sessions:
+            try:
+                backend.set_volume(session, level)
+            except Exception as e:
+                self.guard.failed(session, 'set_volume', e)
+                continue
+            if session.key in self.guard.failing:
+                self.guard.succeeded(session.key)
+
+    def volume(self, backend):
+        # With every session failing, the last level set stands in; Windows starts sessions at full volume
+        return max(self._read('get_volume', backend.get_volume), default=1.0 if self.level is None else self.level)
+
+    def set_volume(self, backend, level):
+        self.level = level
+        self._write(backend, self.sessions.values(), level)
+
+    def mute(self, backend):
+        return any(self._read('get_mute', backend.get_mute))
+
+    @property
+    def active(self):
+        return any(session.active for session in self.sessions.values())
+
+    def peak(self, backend):
+        # Called for every program every frame, so the healthy path is a dict check per session
+        peak = 0.0
+        guard = self.guard
+        failing = guard.failing if guard is not None else None
+        for session in self.sessions.values():
+            if not session.active or (failing and not guard.allow(session.key)):
+                continue
+            try:
+                value = backend.get_peak(session)
+            except Exception as e:
+                if guard is None:
+                    raise
+                guard.failed(session, 'get_peak', e)
+                continue
+            if failing and session.key in failing:
+                guard.succeeded(session.key)
+            if value > peak:
+                peak = value
+        return peak
+
+
+class ProgramTable:
+    """Live sessions grouped into programs by AppRules.
+
+    The one place sessions join and leave programs, shared by the audio
+    worker and mixer_cli so both group exactly alike. restore, if given, is
+    called with each new ProgramGroup before its first session joins, so a
+    level it sets is applied to that session.
+    """
+
+    def __init__(self, rules, guard=None, restore=None):
+        self.rules = rules
+        self.guard = guard
+        self.restore = restore
+        self.programs = {}  # program name -> ProgramGroup
+        self.session_programs = {}  # session key -> program name
+
+    def apply(self, backend, added, expired, activity=()):
+        """Apply one SessionTracker.poll(); returns (new, removed, touched) program names.
+
+        touched holds the live programs whose sessions came, went or started
+        or stopped playing. A program that lost its last session and got a
+        new one in the same poll is in both removed and new.
+        """
+        removed = []
+        touched = set()
+        for session in expired:
+            if self.guard is not None:
+                self.guard.forget(session.key)
+            program_name = self.session_programs.pop(session.key, None)
+            if program_name is None:
+                continue
+            touched.add(program_name)
+            if self.programs[program_name].remove(session.key):
+                del self.programs[program_name]
+                removed.append(program_name)
+
+        new = []
+        for session in added:
+            with profiler.phase('name_resolution'):
+                program_name = self.rules.program_name(session.name, session.app_name)
+            if program_name is None:
+                continue
+            self.session_programs[session.key] = program_name
+            touched.add(program_name)
+            group = self.programs.get(program_name)
+            if group is None:
+                group = self.programs[program_name] = ProgramGroup(program_name, self.guard)
+                if self.restore is not None:
+                    self.restore(group)
+                new.append(program_name)
+            group.add(session, backend)
+
+        touched.update(self.session_programs.get(session.key) for session in activity)
+        return new, removed, {program_name for program_name in touched if program_name in self.programs}
+
+    def changed(self, keys):
+        """Program names of the given session keys, each once, in order; unknown keys are skipped."""
+        names = {}
+        for key in keys:
+            program_name = self.session_programs.get(key)
+            if program_name is not None:
+                names[program_name] = None
+        return list(names)
+
+
+class SessionTracker:
+    """Keeps the set of live audio sessions up to date from an AudioBackend.
+
+    The backend calls back from whatever thread the notification arrives on,
+    so events are only queued there and applied on the caller's thread in
+    poll(). Volume events are only delivered for changes made by someone
+    else; the backend filters out the ones caused by its own writes.
+    on_event, if given, is called after each event is queued, on the
+    backend's thread, so the owner can poll right away.
+    """
+
+    def __init__(self, backend, on_event=None):
+        self.backend = backend
+        self.on_event = on_event
+        self.sessions = {}
+        self._events = deque()
+
+    def start(self):
+        self.backend.start(self._session_created, self._session_expired, self._volume_changed,
+                           self._state_changed)
+
+    def stop(self):
+        # Every session is released while the backend can still take it back,
+        # including ones created since the last poll. Callbacks keep arriving
+        # until backend.stop(), so the queue is drained rather than iterated.
+        pending = []
+        events = self._events
+        while events:
+            kind, item = events.popleft()
+            if kind == 'created' and item.key not in self.sessions:
+                pending.append(item)
+        for session in list(self.sessions.values()) + pending:
+            self._release(session)
+        self.sessions.clear()
+        self.backend.stop()
+
+    def _release(self, session):
+        self.backend.release(session)
+        session.close()
+
+    def _session_created(self, session):
+        self._queue('created', session)
+
+    def _session_expired(self, key):
+        self._queue('expired', key)
+
+    def _volume_changed(self, key, level, muted):
+        self._queue('volume', (key, level, muted))
+
+    def _state_changed(self, key, active):
+        self._queue('state', (key, active))
+
+    def _queue(self, kind, item):
+        self._events.append((kind, item))
+        if self.on_event is not None:
+            self.on_event()
+
+    def poll(self):
+        """Apply queued events since the last poll.
+
+        Returns (added, expired, changed, activity) where changed maps the key
+        of each live session whose volume was changed externally to (level,
+        muted), and activity lists the live sessions that started or stopped
+        playing. session.active is already up to date.
+        """
+        added = {}
+        expired = []
+        changed = {}
+        activity = {}
+        while self._events:
+            kind, item = self._events.popleft()
+            if kind == 'created':
+                if item.key not in self.sessions:
+                    self.sessions[item.key] = item
+                    added[item.key] = item
+                continue
+            if kind == 'volume':
+                key, level, muted = item
+                if key in self.sessions:
+                    changed[key] = (level, muted)
+                continue
+            if kind == 'state':
+                key, active = item
+                session = self.sessions.get(key)
+                if session is not None and session.active != active:
+                    session.active = active
+                    if key not in added:
+                        activity[key] = session
+                continue
+            changed.pop(item, None)
+            activity.pop(item, None)
+            session = self.sessions.pop(item, None)
+            if session is None:
+                continue
+            # A session that came and went between two polls is never reported
+            if added.pop(item, None) is None:
+                expired.append(session)
+            self._release(session)
+        return list(added.values()), expired, changed, list(activity.values())
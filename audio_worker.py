@@ -0,0 +1,273 @@
+import queue
+import time
+from collections import deque
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from app_rules import AppRules
+from audio_backend import AudioBackend
+from audio_sessions import ProgramTable, SessionTracker
+from faults import SessionGuard, log
+from meters import MeterSampler
+from perf import profiler
+from ramps import RampScheduler
+from scheduler import AdaptiveScheduler
+from volume_writer import VolumeWriteCoalescer
+
+_STOP = object()
+_WAKE = object()  # Queued by session events so discovery runs now, whatever the backoff
+
+
+class AudioWorker(QThread):
+    """Owns every audio session object and does all audio I/O off the GUI thread.
+
+    The GUI sends commands through submit(); everything the GUI needs to show
+    comes back as plain Python snapshots on the signals below.
+    """
+
+    programs_added = pyqtSignal(object)  # [(program name, volume 0-100)]
+    programs_removed = pyqtSignal(object)  # [program name]
+    volumes_changed = pyqtSignal(object)  # {program name: volume 0-100}
+    mute_changed = pyqtSignal(str, bool)
+    meters_sampled = pyqtSignal(object)  # {program name: (level, peak)}
+
+    def __init__(self, backend, rules=None, meter_rate=30, discovery_interval=1000, app_state=None, parent=None):
+        super().__init__(parent)
+        # An AudioBackend, or a function returning one that run() calls so the
+        # audio libraries are imported and set up on this thread, not the GUI's
+        self.backend = backend
+        self.rules = rules or AppRules.from_settings({})
+        self.app_state = app_state  # AppStateStore, or None to forget programs between runs
+        self.scheduler = AdaptiveScheduler(1 / meter_rate, discovery_interval / 1000, now=time.monotonic())
+        self.commands = queue.SimpleQueue()
+        self.command_latencies = deque(maxlen=1000)  # Seconds from submit() to completion
+        self.tracker = None
+        self.guard = SessionGuard()  # Quarantines sessions that keep failing; its log is rate limited
+        self.errors = self.guard.errors
+        self.meter_sampler = MeterSampler(self.read_peak)
+        self.volume_writes = VolumeWriteCoalescer(self.write_volume, self.errors)
+        self.ramps = RampScheduler()  # Fades advance on the frame tick and write through volume_writes
+        self.table = ProgramTable(self.rules, self.guard, self.restore)
+        self.programs = self.table.programs  # program name -> ProgramGroup
+        self.session_programs = self.table.session_programs  # session key -> program name
+
+    def submit(self, command, *args):
+        """Queue a command from any thread, e.g. submit('set_volume', 'Spotify', 30)."""
+        self.commands.put((command, args, time.perf_counter()))
+
+    def stop(self):
+        self.commands.put(_STOP)
+
+    def run(self):
+        if self.app_state is not None:
+            self.app_state.load()  # Here rather than at construction: disk reads stay off the GUI thread
+        try:
+            if not isinstance(self.backend, AudioBackend):
+                self.backend = self.backend()
+            profiler.gauge('audio_api_calls', lambda: self.backend.api_calls)
+            profiler.section('scheduler', lambda: self.scheduler.report(time.monotonic()))
+            self.tracker = SessionTracker(self.backend, lambda: self.commands.put(_WAKE))
+            self.tracker.start()  # Enumerates once, then follows session events
+        except Exception as e:
+            log.error("session_tracking_failed error=%s detail=%s", type(e).__name__, e)
+            return
+        scheduler = self.scheduler
+        scheduler.wake(time.monotonic())
+        try:
+            while True:
+                writes_pending = bool(self.volume_writes.pending) or self.ramps.active
+                deadline = scheduler.next_deadline(writes_pending)
+                if self.app_state is not None and self.app_state.deadline is not None:
+                    deadline = min(deadline, self.app_state.deadline)  # Saves keep their own debounce
+                timeout = max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.commands.get(timeout=timeout)
+                    while item is not _STOP:
+                        if item is _WAKE:
+                            scheduler.wake(time.monotonic())
+                        else:
+                            self.execute(*item)
+                        item = self.commands.get_nowait()
+                    break
+                except queue.Empty:
+                    pass
+
+                now = time.monotonic()
+                if scheduler.discovery_due(now):
+                    with profiler.phase('discovery'):
+                        scheduler.discovered(self.update_programs(), now)
+                if self.app_state is not None:
+                    self.app_state.flush(now)  # However far discovery has backed off
+                if scheduler.frame_due(now, bool(self.volume_writes.pending) or self.ramps.active):
+                    if self.ramps.active:
+                        with profiler.phase('ramps'):
+                            self.advance_fades(now)
+                    with profiler.phase('volume_writes'):
+                        self.volume_writes.flush()  # At most one write per program per frame
+                    if scheduler.meters_visible:
+                        with profiler.phase('meter_read'):
+                            frame = self.meter_sampler.sample(now)
+                        if frame:
+                            self.meters_sampled.emit(frame)
+        finally:
+            if self.app_state is not None:
+                self.app_state.flush(force=True)
+            self.tracker.stop()
+
+    def execute(self, command, args, submitted):
+        try:
+            with profiler.phase('command'):
+                getattr(self, command)(*args)
+        except Exception as e:
+            self.errors.warning('command_failed', command, args=args, error=type(e).__name__, detail=e)
+        self.command_latencies.append(time.perf_counter() - submitted)
+
+    def set_visibility(self, state):
+        """Window state from the GUI: 'shown', 'minimized', 'hidden' or 'tray'."""
+        self.scheduler.set_visibility(state, time.monotonic())
+
+    def set_volume(self, program_name, value):
+        if program_name in self.programs:
+            self.ramps.cancel(program_name)  # A hand on the slider beats a fade
+            self.volume_writes.set(program_name, value)
+
+    def fade(self, program_name, value, duration_ms, curve='linear'):
+        """Move a program to value (0-100) over duration_ms; a fade already running is retargeted from where it is."""
+        if program_name in self.programs:
+            pending = self.volume_writes.pending.get(program_name)
+            current = pending / 100 if pending is not None else self.programs[program_name].volume(self.backend)
+            self.ramps.start(program_name, current, value / 100, duration_ms / 1000, curve, time.monotonic())
+
+    def cancel_fade(self, program_name):
+        """Stop a fade where it is."""
+        self.ramps.cancel(program_name)
+
+    def advance_fades(self, now):
+        # Every fade steps together; only programs whose rounded volume moved are written and sent to the sliders
+        changes = self.ramps.tick(now)
+        for program_name, value in changes.items():
+            self.volume_writes.set(program_name, value)
+        if changes:
+            self.volumes_changed.emit(changes)
+
+    def commit_volume(self, program_name, value):
+        # End of a drag: the final value is written now rather than next frame
+        self.set_volume(program_name, value)
+        self.volume_writes.flush(program_name)
+
+    def write_volume(self, program_name, value):
+        if program_name in self.programs:
+            group = self.programs[program_name]
+            group.set_volume(self.backend, value / 100)
+            if value > 0:
+                group.muted = False
+            self.remember(group, value / 100)
+
+    def read_peak(self, group):
+        return group.peak(self.backend)
+
+    def toggle_mute(self, program_name):
+        if program_name in self.programs:
+            self.ramps.cancel(program_name)
+            self.volume_writes.flush(program_name)
+            group = self.programs[program_name]
+            current_volume = group.volume(self.backend)
+            if current_volume > 0:
+                group.last_volume = current_volume
+                group.set_volume(self.backend, 0)
+                group.muted = True
+            else:
+                group.set_volume(self.backend, group.last_volume or 1)
+                group.muted = False
+            self.mute_changed.emit(program_name, group.muted)
+            volume = group.volume(self.backend)
+            self.remember(group, volume)
+            self.volumes_changed.emit({program_name: int(volume * 100)})
+
+    def set_mute(self, program_name, muted):
+        if program_name in self.programs:
+            self.volume_writes.flush(program_name)
+            if (self.programs[program_name].volume(self.backend) > 0) == muted:
+                self.toggle_mute(program_name)
+
+    def remember(self, group, volume):
+        if self.app_state is not None:
+            self.app_state.remember(group.name, volume, group.muted, group.last_volume)
+
+    def restore(self, group):
+        """Give a program that just appeared the volume and mute state it had last time."""
+        state = self.app_state.get(group.name) if self.app_state is not None else None
+        if state is not None:
+            group.level = state['volume']  # ProgramGroup.add applies it to each session
+            group.muted = state['volume'] == 0  # Muting is volume 0; older files can say muted at 60%
+            group.last_volume = state['last_volume']
+
+    def update_programs(self):
+        """Apply session changes since the last poll; returns True if there were any."""
+        try:
+            with profiler.phase('enumerate'):
+                added, expired, changed, activity = self.tracker.poll()
+            new, removed, touched = self.table.apply(self.backend, added, expired, activity)
+            for program_name in removed:
+                self.meter_sampler.remove(program_name)
+                self.volume_writes.discard(program_name)
+                self.ramps.cancel(program_name)
+            if removed:
+                self.programs_removed.emit(removed)
+
+            new_programs = []
+            for program_name in new:
+                group = self.programs[program_name]
+                self.meter_sampler.add(program_name, group)
+                new_programs.append((program_name, int(group.volume(self.backend) * 100)))
+            if new_programs:
+                self.programs_added.emit(new_programs)
+                for program_name, volume in new_programs:
+                    if self.programs[program_name].muted:
+                        self.mute_changed.emit(program_name, True)
+
+            # Inactive programs leave the meter loop and fall back in as soon as they play again
+            for program_name in touched:
+                self.meter_sampler.set_active(program_name, self.programs[program_name].active)
+
+            # Only changes made outside the mixer are sent back to the sliders
+            volumes = {}
+            for program_name in self.table.changed(changed):
+                group = self.programs[program_name]
+                group.level = None  # Someone else is in charge now; don't force it on new sessions
+                volume = group.volume(self.backend)
+                if group.muted != (volume == 0):
+                    group.muted = volume == 0  # Raised or zeroed from outside; the button follows
+                    self.mute_changed.emit(program_name, group.muted)
+                self.remember(group, volume)
+                volumes[program_name] = int(volume * 100)
+            if volumes:
+                self.volumes_changed.emit(volumes)
+            return bool(added or expired or changed or activity)
+        except Exception as e:
+            self.errors.warning('update_failed', 'programs', error=type(e).__name__, detail=e)
+            return False
+
+
+if __name__ == '__main__':
+    # Command path latency against the simulated backend
+    import statistics
+    import sys
+    from PyQt5.QtCore import QCoreApplication
+    from audio_backend import SimulatedBackend
+
+    app = QCoreApplication(sys.argv)
+    backend = SimulatedBackend(clock=time.monotonic)
+    backend.populate(50, [f'program{i}.exe' for i in range(50)])
+    worker = AudioWorker(backend, meter_rate=60)
+    worker.start()
+    time.sleep(0.1)
+    for i in range(5000):
+        worker.submit('set_volume', f'program{i % 50}', i % 101)
+        if i % 100 == 0:
+            time.sleep(0.001)  # Let some commands arrive on an idle worker
+    worker.stop()
+    worker.wait()
+    latencies = sorted(worker.command_latencies)
+    print(f"{len(latencies)} commands: median {statistics.median(latencies) * 1e6:.1f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us")
@@ -0,0 +1,102 @@
+from PyQt5.QtNetwork import QLocalSocket
+
+from control_server import encode_frame, read_frames
+
+
+class ControlClient:
+    """Blocking client for ControlServer; needs no Qt event loop.
+
+    request() waits for each reply. For throughput, send() a run of requests
+    and then receive() their replies, which come back in the same order.
+    """
+
+    def __init__(self, name='VolumeMixer', timeout=1000):
+        self.timeout = timeout
+        self.socket = QLocalSocket()
+        self.socket.connectToServer(name)
+        if not self.socket.waitForConnected(timeout):
+            raise ConnectionError(f"Could not connect to {name}: {self.socket.errorString()}")
+        self.buffer = bytearray()
+        self.replies = []
+        self.next_id = 0
+
+    def send(self, cmd, **fields):
+        self.next_id += 1
+        self.socket.write(encode_frame(dict(fields, cmd=cmd, id=self.next_id)))
+        return self.next_id
+
+    def receive(self):
+        self.socket.flush()
+        while not self.replies:
+            if not self.socket.waitForReadyRead(self.timeout):
+                raise TimeoutError(f"No reply from the mixer: {self.socket.errorString()}")
+            self.buffer += self.socket.readAll().data()
+            self.replies.extend(read_frames(self.buffer))
+        return self.replies.pop(0)
+
+    def request(self, cmd, **fields):
+        self.send(cmd, **fields)
+        return self.receive()
+
+    def close(self):
+        self.socket.disconnectFromServer()
+
+
+if __name__ == '__main__':
+    # Load test: concurrent clients pipelining set commands into a mixer on the simulated backend
+    import json
+    import os
+    import shutil
+    import sys
+    import tempfile
+    import threading
+    import time
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QEventLoop
+    from PyQt5.QtWidgets import QApplication
+
+    directory = tempfile.mkdtemp()
+    working_directory = os.getcwd()
+    os.chdir(directory)  # The mixer keeps settings.json and app_state.json in the working directory
+    server_name = f'VolumeMixer-bench-{os.getpid()}'
+    with open('settings.json', 'w') as f:
+        json.dump({'audio_backend': 'simulated', 'control_server': server_name}, f)
+    from VolumeMixer import VolumeMixer
+
+    app = QApplication(sys.argv)
+    mixer = VolumeMixer()
+    while len(mixer.program_model.programs) < 8:
+        app.processEvents(QEventLoop.AllEvents, 10)
+    names = [program.name for program in mixer.program_model.programs]
+
+    def run_clients(client_count, commands, window):
+        results = []
+
+        def client(index):
+            control = ControlClient(server_name)
+            start = time.perf_counter()
+            for first in range(0, commands, window):
+                for i in range(first, min(first + window, commands)):
+                    control.send('set', program=names[(index + i) % len(names)], volume=i % 101)
+                for i in range(first, min(first + window, commands)):
+                    reply = control.receive()
+                    assert reply['ok'], reply
+            results.append(time.perf_counter() - start)
+            control.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(client_count)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            app.processEvents(QEventLoop.AllEvents, 5)
+        elapsed = time.perf_counter() - start
+        return client_count * commands / elapsed, max(results) / commands * window
+
+    for client_count, window in ((1, 1), (1, 100), (8, 1), (8, 100)):
+        rate, window_time = run_clients(client_count, 2000, window)
+        print(f"{client_count} client(s), {window:3d} in flight: {rate:8.0f} commands/s, "
+              f"{window_time * 1e3:.3f} ms per window")
+    mixer.close()
+    os.chdir(working_directory)
+    shutil.rmtree(directory)
@@ -0,0 +1,208 @@
+import json
+import struct
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+from faults import log
+from perf import profiler
+from ramps import CURVES
+
+# A frame is a 4-byte big-endian length followed by that many bytes of UTF-8 JSON
+HEADER = struct.Struct('>I')
+MAX_FRAME = 1 << 20
+
+
+def encode_frame(message):
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
+
+
+def read_frames(buffer):
+    """Pop every complete frame off the front of a bytearray and return the decoded messages."""
+    messages = []
+    offset = 0
+    while len(buffer) - offset >= HEADER.size:
+        (length,) = HEADER.unpack_from(buffer, offset)
+        if length > MAX_FRAME:
+            raise ValueError(f"Frame of {length} bytes is over the {MAX_FRAME} byte limit")
+        end = offset + HEADER.size + length
+        if len(buffer) < end:
+            break
+        messages.append(json.loads(buffer[offset + HEADER.size:end]))
+        offset = end
+    del buffer[:offset]
+    return messages
+
+
+class ControlServer(QObject):
+    """Local socket endpoint that lets scripts drive the mixer.
+
+    Requests are JSON objects such as {"id": 1, "cmd": "set", "program":
+    "Spotify", "volume": 30}; the reply echoes "id" and carries "ok" plus a
+    result or an "error". Clients may pipeline: every frame that has arrived
+    is handled in order and the replies go back in a single write. Commands
+    go through the same VolumeMixer methods the list view uses, so volume
+    writes are coalesced per frame exactly like a slider drag.
+    """
+
+    def __init__(self, mixer, parent=None):
+        super().__init__(parent)
+        self.mixer = mixer
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._accept)
+        self.buffers = {}  # socket -> bytes received but not yet handled
+        self.requests = 0
+        self.commands = {
+            'list': self.list,
+            'get': self.get,
+            'set': self.set,
+            'mute': self.mute,
+            'batch': self.batch,
+            'fade': self.fade,
+            'perf': self.perf,
+        }
+
+    def listen(self, name):
+        probe = QLocalSocket()
+        probe.connectToServer(name)
+        if probe.waitForConnected(200):
+            # Another mixer is running; taking its name would leave it unreachable by scripts
+            probe.disconnectFromServer()
+            log.warning("control_server_in_use name=%s", name)
+            return False
+        QLocalServer.removeServer(name)  # Nothing answered, so this only clears a socket file left by a crash
+        if not self.server.listen(name):
+            log.error("control_server_failed name=%s detail=%s", name, self.server.errorString())
+            return False
+        return True
+
+    def close(self):
+        self.server.close()
+        for socket in list(self.buffers):
+            socket.disconnectFromServer()
+
+    def _accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = bytearray()
+            socket.readyRead.connect(lambda socket=socket: self._read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._drop(socket))
+
+    def _drop(self, socket):
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def _read(self, socket):
+        buffer = self.buffers.get(socket)
+        if buffer is None:
+            return
+        buffer += socket.readAll().data()
+        try:
+            requests = read_frames(buffer)
+        except ValueError as e:
+            log.warning("control_request_unreadable detail=%s", e)
+            socket.abort()
+            return
+        if requests:
+            socket.write(b''.join(encode_frame(self.handle(request)) for request in requests))
+
+    def handle(self, request):
+        self.requests += 1
+        try:
+            command = self.commands.get(request['cmd'])
+            if command is None:
+                reply = {'ok': False, 'error': f"unknown command {request['cmd']!r}"}
+            else:
+                reply = command(request)
+        except KeyError as e:
+            reply = {'ok': False, 'error': f"missing field {e}"}
+        except (TypeError, ValueError) as e:
+            reply = {'ok': False, 'error': str(e)}
+        except Exception as e:
+            # Never let one request escape the readyRead slot; PyQt would abort the mixer
+            log.error("control_request_failed request=%r error=%s detail=%s", request, type(e).__name__, e)
+            reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        if isinstance(request, dict) and 'id' in request:
+            reply['id'] = request['id']
+        return reply
+
+    def _program(self, request):
+        model = self.mixer.program_model
+        row = model.rows.get(request['program'])
+        return None if row is None else model.programs[row]
+
+    @staticmethod
+    def _volume(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+            raise ValueError(f"volume must be a number from 0 to 100, not {value!r}")
+        return int(round(value))
+
+    def list(self, request):
+        return {'ok': True, 'programs': [{'program': program.name, 'volume': program.volume, 'muted': program.muted}
+                                         for program in self.mixer.program_model.programs]}
+
+    def get(self, request):
+        program = self._program(request)
+        if program is None:
+            return {'ok': False, 'error': f"unknown program {request['program']!r}"}
+        return {'ok': True, 'program': program.name, 'volume': program.volume, 'muted': program.muted}
+
+    def set(self, request):
+        program = self._program(request)
+        if program is None:
+            return {'ok': False, 'error': f"unknown program {request['program']!r}"}
+        volume = self._volume(request['volume'])
+        self.mixer.program_model.set_volume(program.name, volume)
+        self.mixer.set_volume(program.name, volume)
+        return {'ok': True}
+
+    def mute(self, request):
+        """Mute or unmute with "muted": true/false, or toggle when it is left out."""
+        program = self._program(request)
+        if program is None:
+            return {'ok': False, 'error': f"unknown program {request['program']!r}"}
+        muted = request.get('muted')
+        if muted is None:
+            self.mixer.toggle_mute(program.name)
+        else:
+            self.mixer.set_mute(program.name, bool(muted))
+        return {'ok': True}
+
+    def batch(self, request):
+        """Set {"volumes": {program: volume}} at once; unknown programs are listed, not fatal."""
+        if not isinstance(request['volumes'], dict):
+            raise ValueError(f"volumes must be an object of program: volume, not {request['volumes']!r}")
+        volumes = {name: self._volume(value) for name, value in request['volumes'].items()}
+        model = self.mixer.program_model
+        missing = [name for name in volumes if name not in model.rows]
+        for name in missing:
+            del volumes[name]
+        model.set_volumes(volumes)
+        for name, volume in volumes.items():
+            self.mixer.set_volume(name, volume)
+        return {'ok': True, 'missing': missing}
+
+    def fade(self, request):
+        """Fade to "volume" over "duration" ms with an optional "curve"; {"cancel": true} stops a fade where it is."""
+        program = self._program(request)
+        if program is None:
+            return {'ok': False, 'error': f"unknown program {request['program']!r}"}
+        if request.get('cancel'):
+            self.mixer.cancel_fade(program.name)
+            return {'ok': True}
+        volume = self._volume(request['volume'])
+        duration = request['duration']
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration < 0:
+            raise ValueError(f"duration must be a number of milliseconds, not {duration!r}")
+        curve = request.get('curve', 'linear')
+        if curve not in CURVES:
+            raise ValueError(f"curve must be one of {', '.join(CURVES)}, not {curve!r}")
+        self.mixer.fade(program.name, volume, duration, curve)
+        return {'ok': True}
+
+    def perf(self, request):
+        """Profiler snapshot; {"enabled": true/false} turns profiling on or off first."""
+        if 'enabled' in request:
+            profiler.enabled = bool(request['enabled'])
+        return dict(profiler.snapshot(), ok=True)
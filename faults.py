@@ -0,0 +1,137 @@
+import logging
+import time
+
+log = logging.getLogger('volume_mixer')
+
+
+class RateLimitedLog:
+    """Structured warnings, at most one per (event, subject) every `interval` seconds.
+
+    Records read as "event subject key=value ..." and carry the event and
+    fields as record attributes for handlers that want them. Repeats within
+    the interval are only counted, and the count goes out with the next
+    record for that subject, so a session failing every frame costs one line
+    a minute instead of thirty a second.
+    """
+
+    def __init__(self, logger=log, interval=60.0, clock=time.monotonic):
+        self.logger = logger
+        self.interval = interval
+        self.clock = clock
+        self.records = 0
+        self._last = {}  # (event, subject) -> [time of the last record, repeats suppressed since]
+
+    def warning(self, event, subject, **fields):
+        now = self.clock()
+        last = self._last.get((event, subject))
+        if last is not None and now - last[0] < self.interval:
+            last[1] += 1
+            return
+        if last is not None and last[1]:
+            fields['suppressed'] = last[1]
+        self._last[(event, subject)] = [now, 0]
+        self.records += 1
+        self.logger.warning('%s %s %s', event, subject, ' '.join(f'{key}={value}' for key, value in fields.items()),
+                            extra={'event': event, 'subject': subject, 'fields': fields})
+
+    def forget(self, subject):
+        for key in [key for key in self._last if key[1] == subject]:
+            del self._last[key]
+
+
+class SessionGuard:
+    """Circuit breaker per session, so one broken session never stalls the others.
+
+    A session that fails `threshold` times in a row is quarantined: it is
+    skipped for `quarantine` seconds, then tried once. Success closes the
+    breaker; another failure quarantines it again for twice as long, up to
+    `max_quarantine`. Healthy sessions never touch the breaker beyond a
+    dict lookup in `failing`.
+    """
+
+    def __init__(self, threshold=3, quarantine=1.0, max_quarantine=60.0, clock=time.monotonic, errors=None):
+        self.threshold = threshold
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self.clock = clock
+        self.errors = errors or RateLimitedLog(clock=clock)
+        self.failing = {}  # session key -> [consecutive failures, quarantined until, current quarantine]
+        self.quarantined = 0  # Times any session was quarantined
+
+    def allow(self, key):
+        """False while key is quarantined; a session not in `failing` is always allowed."""
+        state = self.failing.get(key)
+        return state is None or self.clock() >= state[1]
+
+    def failed(self, session, operation, error):
+        state = self.failing.get(session.key)
+        if state is None:
+            state = self.failing[session.key] = [0, 0.0, 0.0]
+        state[0] += 1
+        if state[0] >= self.threshold:
+            state[2] = min(state[2] * 2, self.max_quarantine) if state[2] else self.quarantine
+            state[1] = self.clock() + state[2]
+            self.quarantined += 1
+        self.errors.warning('session_error', session.key, program=session.name, operation=operation,
+                            error=type(error).__name__, detail=error, failures=state[0],
+                            quarantine=round(max(0.0, state[1] - self.clock()), 1))
+
+    def succeeded(self, key):
+        self.failing.pop(key, None)
+
+    def forget(self, key):
+        """The session has expired."""
+        self.failing.pop(key, None)
+        self.errors.forget(key)
+
+
+if __name__ == '__main__':
+    # Fault injection against the simulated backend: one session of ten, and one of a grouped pair, fail every call
+    from audio_backend import SimulatedBackend
+    from audio_sessions import ProgramGroup
+    from meters import MeterSampler
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    backend = SimulatedBackend()
+    clock = lambda: backend.now
+    guard = SessionGuard(clock=clock, errors=RateLimitedLog(clock=clock))
+    sampler = MeterSampler(lambda group: group.peak(backend))
+    groups = []
+    for i, session in enumerate(backend.populate(10, [f'program{i}.exe' for i in range(10)])):
+        group = ProgramGroup(f'program{i}', guard)
+        group.add(session, backend)
+        sampler.add(group.name, group)
+        groups.append(group)
+    bad = groups[3].sessions[next(iter(groups[3].sessions))]
+    zoom = ProgramGroup('Zoom', guard)
+    zoom_good, zoom_bad = backend.add_session('zoom.exe'), backend.add_session('zoommeeting.exe')
+    zoom.add(zoom_good, backend)
+    zoom.add(zoom_bad, backend)
+    sampler.add('Zoom', zoom)
+    backend.fail(bad.key, ProcessLookupError('process 1004 no longer exists'))
+    backend.fail(zoom_bad.key, OSError('RPC server is unavailable'))
+
+    frames = 30 * 120  # Two minutes at 30 Hz
+    nonzero = {name: 0 for name in sampler.meters}
+    for frame in range(frames):
+        backend.advance(1 / 30)
+        for name, (level, peak) in sampler.sample(backend.now).items():
+            nonzero[name] += level > 0
+    zoom.set_volume(backend, 0.5)
+
+    healthy = [name for name in nonzero if name != 'program3']
+    assert all(nonzero[name] >= frames * 0.9 for name in healthy), nonzero
+    assert backend.failed_calls[bad.key] < 20, backend.failed_calls
+    assert zoom_good.volume.level == 0.5 and zoom.volume(backend) == 0.5
+    assert guard.errors.records <= 2 * 3, guard.errors.records
+
+    # A session that recovers is let back in at its next trial, and an expired one is forgotten
+    backend.fail(bad.key, None)
+    backend.advance(guard.max_quarantine)
+    sampler.sample(backend.now)
+    assert bad.key not in guard.failing and zoom_bad.key in guard.failing
+    guard.forget(zoom_bad.key)
+    assert not guard.failing
+    print(f"{frames} frames: healthy meters live in {min(nonzero[name] for name in healthy)}+ frames each; "
+          f"failing sessions called {backend.failed_calls[bad.key]} and {backend.failed_calls[zoom_bad.key]} times "
+          f"instead of {frames}; {guard.quarantined} quarantines, {guard.errors.records} log records")
@@ -0,0 +1,109 @@
+import time
+from itertools import chain
+
+
+class MeterSampler:
+    """Polls session peak meters through read_peak(session) and smooths them for display.
+
+    Levels attack instantly and fall back at `decay` full-scales per second.
+    The peak marker sits on the highest recent level for `hold` seconds before
+    it starts falling at the same rate.
+
+    Only active meters are read. An inactive one is silent by definition, so
+    it decays to zero locally and then drops out of the frame altogether;
+    the cost of a frame follows the number of sessions actually playing.
+    """
+
+    def __init__(self, read_peak, decay=1.5, hold=0.8):
+        self.read_peak = read_peak
+        self.decay = decay
+        self.hold = hold
+        self.meters = {}  # name -> session, active or not
+        self.active = {}  # name -> session, read every frame
+        self.decaying = {}  # name -> None, inactive but not down to zero yet
+        self.levels = {}  # name -> smoothed level, 0..1
+        self.peaks = {}  # name -> [held level, time it was reached]
+        self._last_sample = None
+
+    def add(self, name, session, active=True):
+        self.meters[name] = session
+        self.levels.setdefault(name, 0.0)
+        self.peaks.setdefault(name, [0.0, 0.0])
+        self.set_active(name, active)
+
+    def remove(self, name):
+        self.meters.pop(name, None)
+        self.active.pop(name, None)
+        self.decaying.pop(name, None)
+        self.levels.pop(name, None)
+        self.peaks.pop(name, None)
+
+    def set_active(self, name, active):
+        session = self.meters.get(name)
+        if session is None:
+            return
+        if active:
+            self.active[name] = session
+            self.decaying.pop(name, None)
+        elif self.active.pop(name, None) is not None or self.levels[name] or self.peaks[name][0]:
+            self.decaying[name] = None
+
+    def sample(self, now=None):
+        """Read every active meter once and return {name: (level, peak)} for this frame."""
+        if now is None:
+            now = time.monotonic()
+        elapsed = 0.0 if self._last_sample is None else now - self._last_sample
+        self._last_sample = now
+        fall = self.decay * elapsed
+        levels = self.levels
+        peaks = self.peaks
+        read_peak = self.read_peak
+        frame = {}
+        settled = []
+        for name, session in chain(self.active.items(), self.decaying.items()):
+            if session is None:
+                value = 0.0
+            else:
+                try:
+                    value = read_peak(session)
+                except Exception:
+                    value = 0.0  # a dying session reads as silence until it expires
+            level = levels[name] - fall
+            if value > level:
+                level = value
+            if level < 0.0:
+                level = 0.0
+            levels[name] = level
+
+            peak = peaks[name]
+            if level >= peak[0]:
+                peak[0] = level
+                peak[1] = now
+            elif now - peak[1] > self.hold:
+                peak[0] = max(level, peak[0] - fall)
+            frame[name] = (level, peak[0])
+            if session is None and not peak[0]:
+                settled.append(name)  # This frame carries its final zero
+        for name in settled:
+            del self.decaying[name]
+        return frame
+
+
+if __name__ == '__main__':
+    # Synthetic benchmark: cost of one sampling pass per frame, with all or a tenth of the sessions active
+    from audio_backend import SimulatedBackend
+
+    for count in (10, 100, 1000):
+        for active_share in (1.0, 0.1):
+            backend = SimulatedBackend()
+            sampler = MeterSampler(backend.get_peak)
+            for i, session in enumerate(backend.populate(count)):
+                sampler.add(f'program{i}', session, active=i < count * active_share)
+            frames = 600
+            start = time.perf_counter()
+            for _ in range(frames):
+                backend.advance(1 / 60)
+                sampler.sample(backend.now)
+            elapsed = time.perf_counter() - start
+            print(f"{count:5d} sessions, {len(sampler.active):4d} active: {elapsed / frames * 1e3:.3f} ms/frame, "
+                  f"{backend.peak_reads / frames:6.1f} peak reads/frame")
@@ -0,0 +1,292 @@
+"""Control program volumes from the command line, without starting the mixer window.
+
+    python mixer_cli.py list [--json]
+    python mixer_cli.py get Spotify [--json]
+    python mixer_cli.py set Spotify 30
+    python mixer_cli.py fade Spotify 20 [--duration MS] [--curve linear|exponential|equal-power]
+    python mixer_cli.py mute Spotify [--off | --toggle]
+    python mixer_cli.py watch [--json] [--interval MS]
+
+Programs are named and grouped by the same settings.json rules as the GUI.
+Only the standard library is imported up front; the audio layer is imported
+once a command needs it. Qt is only loaded by set, fade and mute, to hand
+the change to a running mixer window through its control socket: the window
+owns app_state.json and would overwrite what the CLI recorded there. With
+no window running they write app_state.json themselves, so the window
+restores the new volume rather than the old one.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+SETTINGS_FILE = 'settings.json'
+APP_STATE_FILE = 'app_state.json'
+
+
+def load_settings():
+    try:
+        if os.path.exists(SETTINGS_FILE):
+            with open(SETTINGS_FILE, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Error loading settings: {e}", file=sys.stderr)
+    return {}
+
+
+class Mixer:
+    """The programs playing right now, grouped exactly like AudioWorker groups them."""
+
+    def __init__(self, settings):
+        from app_rules import AppRules
+        from audio_backend import create_backend
+        from audio_sessions import ProgramTable, SessionTracker
+        from faults import SessionGuard
+
+        self.settings = settings
+        self.rules = AppRules.from_settings(settings)
+        self.backend = create_backend(settings.get('audio_backend'))
+        self.tracker = SessionTracker(self.backend)
+        # Nothing is restored here: reading a volume from the command line should not change it
+        self.table = ProgramTable(self.rules, SessionGuard())
+        self.programs = self.table.programs  # program name -> ProgramGroup
+
+    def __enter__(self):
+        self.tracker.start()
+        self.update()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracker.stop()
+
+    def update(self):
+        """Apply session events since the last call; returns (added, removed, changed) program names."""
+        added, expired, changed, activity = self.tracker.poll()
+        new, removed, _ = self.table.apply(self.backend, added, expired, activity)
+        return new, removed, sorted(self.table.changed(changed))
+
+    def find(self, name):
+        """Program by display name, ignoring case."""
+        group = self.programs.get(name)
+        if group is None:
+            folded = name.casefold()
+            group = next((group for program_name, group in self.programs.items()
+                          if program_name.casefold() == folded), None)
+        return group
+
+    def describe(self, group):
+        volume = round(group.volume(self.backend) * 100)
+        return {'program': group.name, 'volume': volume, 'muted': volume == 0 or group.mute(self.backend)}
+
+
+def print_programs(programs, as_json):
+    if as_json:
+        print(json.dumps(programs))
+        return
+    for program in programs:
+        print(f"{program['program']:30s} {program['volume']:3d}%{'  muted' if program['muted'] else ''}")
+
+
+def command_list(mixer, args):
+    print_programs([mixer.describe(group) for group in mixer.programs.values()], args.json)
+
+
+def command_get(mixer, args):
+    group = mixer.find(args.program)
+    if group is None:
+        return unknown(args.program)
+    program = mixer.describe(group)
+    if args.json:
+        print(json.dumps(program))
+    else:
+        print_programs([program], False)
+
+
+def command_set(mixer, args):
+    group = mixer.find(args.program)
+    if group is None:
+        return unknown(args.program)
+    sent = send_to_window(mixer, 'set', program=group.name, volume=args.volume)
+    if sent is not None:
+        return sent
+    group.set_volume(mixer.backend, args.volume / 100)
+    remember_volume(group.name, args.volume / 100)
+
+
+def command_fade(mixer, args):
+    """Step the volume to args.volume over args.duration ms, 60 times a second, then return.
+
+    A running mixer window is asked to run the fade instead, and this returns at once.
+    """
+    from ramps import RampScheduler
+
+    group = mixer.find(args.program)
+    if group is None:
+        return unknown(args.program)
+    sent = send_to_window(mixer, 'fade', program=group.name, volume=args.volume, duration=args.duration,
+                          curve=args.curve)
+    if sent is not None:
+        return sent
+    ramps = RampScheduler()
+    ramps.start(group.name, group.volume(mixer.backend), args.volume / 100, args.duration / 1000, args.curve)
+    while ramps.active:
+        for step in ramps.tick().values():
+            group.set_volume(mixer.backend, step / ramps.steps)
+        time.sleep(1 / 60)
+    remember_volume(group.name, args.volume / 100)
+
+
+def window_client(settings):
+    """A ControlClient connected to a running mixer window, or None if none is listening."""
+    name = settings.get('control_server', 'VolumeMixer')
+    if not name:
+        return None
+    try:
+        from control_client import ControlClient
+        return ControlClient(name, timeout=500)
+    except (ImportError, ConnectionError):
+        return None
+
+
+def send_to_window(mixer, cmd, **fields):
+    """Hand a command to a running mixer window; None if there is none, else the exit code."""
+    client = window_client(mixer.settings)
+    if client is None:
+        return None
+    try:
+        reply = client.request(cmd, **fields)
+    finally:
+        client.close()
+    if not reply['ok']:
+        print(f"The mixer window refused: {reply['error']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def remember_volume(program_name, volume):
+    """Record a volume set from here, so the window doesn't restore the old one when it next sees the program."""
+    from app_state import AppStateStore
+
+    store = AppStateStore(APP_STATE_FILE)
+    store.load()
+    state = store.get(program_name) or {}
+    store.remember(program_name, volume, state.get('muted', False), state.get('last_volume'))
+    store.flush(force=True)
+
+
+def command_mute(mixer, args):
+    # Muting is volume 0 with the old volume kept in app_state.json, the same as in the GUI
+    from app_state import AppStateStore
+
+    group = mixer.find(args.program)
+    if group is None:
+        return unknown(args.program)
+    fields = {} if args.state == 'toggle' else {'muted': args.state == 'on'}
+    sent = send_to_window(mixer, 'mute', program=group.name, **fields)
+    if sent is not None:
+        return sent
+    store = AppStateStore(APP_STATE_FILE)
+    store.load()
+    state = store.get(group.name) or {}
+    volume = group.volume(mixer.backend)
+    muted = volume == 0
+    if args.state == 'toggle':
+        mute = not muted
+    else:
+        mute = args.state == 'on'
+    if mute and not muted:
+        group.set_volume(mixer.backend, 0)
+        store.remember(group.name, 0.0, True, volume)
+    elif not mute and muted:
+        volume = state.get('last_volume') or 1.0
+        group.set_volume(mixer.backend, volume)
+        store.remember(group.name, volume, False, state.get('last_volume'))
+    store.flush(force=True)
+
+
+def command_watch(mixer, args):
+    """Print programs as they appear, go away or change volume, until interrupted."""
+    def report(event, names):
+        for name in names:
+            program = mixer.describe(mixer.programs[name]) if name in mixer.programs else {'program': name}
+            if args.json:
+                print(json.dumps(dict(program, event=event)), flush=True)
+            else:
+                details = f" {program['volume']}%" if 'volume' in program else ''
+                print(f"{event:8s} {name}{details}", flush=True)
+
+    report('added', list(mixer.programs))
+    try:
+        while True:
+            time.sleep(args.interval / 1000)
+            added, removed, changed = mixer.update()
+            report('removed', removed)
+            report('added', added)
+            report('changed', changed)
+    except KeyboardInterrupt:
+        pass
+
+
+def unknown(program_name):
+    print(f"No program named {program_name!r} is playing audio", file=sys.stderr)
+    return 1
+
+
+def volume(value):
+    value = int(value)
+    if not 0 <= value <= 100:
+        raise argparse.ArgumentTypeError("volume must be from 0 to 100")
+    return value
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='mixer_cli.py', description="Control program volumes without the window.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_list = commands.add_parser('list', help="show every program and its volume")
+    parser_list.add_argument('--json', action='store_true')
+    parser_list.set_defaults(run=command_list)
+
+    parser_get = commands.add_parser('get', help="show one program's volume")
+    parser_get.add_argument('program')
+    parser_get.add_argument('--json', action='store_true')
+    parser_get.set_defaults(run=command_get)
+
+    parser_set = commands.add_parser('set', help="set a program's volume, 0-100")
+    parser_set.add_argument('program')
+    parser_set.add_argument('volume', type=volume)
+    parser_set.set_defaults(run=command_set)
+
+    from ramps import CURVES  # Standard library only
+
+    parser_fade = commands.add_parser('fade', help="fade a program's volume to 0-100")
+    parser_fade.add_argument('program')
+    parser_fade.add_argument('volume', type=volume)
+    parser_fade.add_argument('--duration', type=int, default=800, help="fade length in ms")
+    parser_fade.add_argument('--curve', choices=list(CURVES), default='linear')
+    parser_fade.set_defaults(run=command_fade)
+
+    parser_mute = commands.add_parser('mute', help="mute a program, or unmute it with --off")
+    parser_mute.add_argument('program')
+    state = parser_mute.add_mutually_exclusive_group()
+    state.add_argument('--off', dest='state', action='store_const', const='off')
+    state.add_argument('--toggle', dest='state', action='store_const', const='toggle')
+    parser_mute.set_defaults(run=command_mute, state='on')
+
+    parser_watch = commands.add_parser('watch', help="print volume changes as they happen")
+    parser_watch.add_argument('--json', action='store_true')
+    parser_watch.add_argument('--interval', type=int, default=250, help="poll interval in ms")
+    parser_watch.set_defaults(run=command_watch)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    with Mixer(load_settings()) as mixer:
+        return args.run(mixer, args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
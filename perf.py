@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from collections import Counter, deque
+
+from faults import log
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Profiler:
+    """Hot-path timers and counters, shared by the GUI and the audio worker.
+
+    Wrap a stage in `with profiler.phase('meter_read'):` and count events with
+    count(name, n). Each phase keeps its last `window` durations, which is
+    what the percentiles are taken over. Counts that something else already
+    keeps, such as the backend's API calls, are read through gauge() only
+    when a snapshot is taken, so they cost nothing per call here.
+
+    While disabled, phase() hands out one shared no-op context manager and
+    count() returns at once; nothing is timed, locked or allocated.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.enabled = False
+        self.samples = {}  # phase -> deque of durations in seconds
+        self.totals = Counter()  # phase -> durations recorded, including those out of the window
+        self.counters = Counter()
+        self.gauges = {}  # name -> callable returning a running count
+        self.sections = {}  # name -> callable returning {key: {field: value}}, e.g. the scheduler's report
+        self._lock = threading.Lock()  # Phases are recorded from the GUI, worker and COM threads
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NO_PHASE
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self.totals[name] += 1
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += n
+
+    def gauge(self, name, read):
+        self.gauges[name] = read
+
+    def section(self, name, read):
+        self.sections[name] = read
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.totals.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        """{'phases': {name: {count, p50_ms, p95_ms, p99_ms, max_ms}}, 'counters': {name: n}, 'sections': {name: dict}}"""
+        with self._lock:
+            samples = {name: sorted(durations) for name, durations in self.samples.items()}
+            totals = dict(self.totals)
+            counters = dict(self.counters)
+        for name, read in self.gauges.items():
+            try:
+                counters[name] = read()
+            except Exception as e:
+                log.error("perf_gauge_failed name=%s error=%s detail=%s", name, type(e).__name__, e)
+        sections = {}
+        for name, read in self.sections.items():
+            try:
+                sections[name] = read()
+            except Exception as e:
+                log.error("perf_section_failed name=%s error=%s detail=%s", name, type(e).__name__, e)
+        phases = {}
+        for name, durations in sorted(samples.items()):
+            last = len(durations) - 1
+            phases[name] = {
+                'count': totals[name],
+                'p50_ms': round(durations[last * 50 // 100] * 1e3, 4),
+                'p95_ms': round(durations[last * 95 // 100] * 1e3, 4),
+                'p99_ms': round(durations[last * 99 // 100] * 1e3, 4),
+                'max_ms': round(durations[last] * 1e3, 4),
+            }
+        return {'enabled': self.enabled, 'time': time.time(), 'phases': phases, 'counters': dict(sorted(counters.items())),
+                'sections': sections}
+
+    def dump(self, path):
+        """Write snapshot() as JSON; returns the snapshot."""
+        snapshot = self.snapshot()
+        with open(path, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        return snapshot
+
+    def report(self):
+        """snapshot() as lines of text, for the debug overlay."""
+        snapshot = self.snapshot()
+        lines = [f"{'phase':16s} {'n':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} ms"]
+        for name, stats in snapshot['phases'].items():
+            lines.append(f"{name:16s} {stats['count']:7d} {stats['p50_ms']:8.3f} "
+                         f"{stats['p95_ms']:8.3f} {stats['p99_ms']:8.3f}")
+        lines += [f"{name:16s} {value:7d}" for name, value in snapshot['counters'].items()]
+        for name, section in snapshot['sections'].items():
+            for key, fields in section.items():
+                lines.append(f"{name} {key}: " + ", ".join(f"{field} {value}" for field, value in fields.items()))
+        return lines
+
+
+profiler = Profiler()
+
+
+if __name__ == '__main__':
+    # Micro-benchmark: what an instrumented stage costs with the profiler off and on
+    runs = 1_000_000
+
+    def bare():
+        start = time.perf_counter()
+        for _ in range(runs):
+            pass
+        return time.perf_counter() - start
+
+    def timed():
+        start = time.perf_counter()
+        for _ in range(runs):
+            with profiler.phase('bench'):
+                pass
+        return time.perf_counter() - start
+
+    def counted():
+        start = time.perf_counter()
+        for _ in range(runs):
+            profiler.count('bench')
+        return time.perf_counter() - start
+
+    baseline = min(bare() for _ in range(3))
+    results = {}
+    for enabled in (False, True):
+        profiler.enabled = enabled
+        results[enabled] = (min(timed() for _ in range(3)) - baseline, min(counted() for _ in range(3)) - baseline)
+    profiler.enabled = False
+    for enabled, (phase, count) in results.items():
+        print(f"{'enabled ' if enabled else 'disabled'}: phase {phase / runs * 1e9:6.1f} ns, "
+              f"count {count / runs * 1e9:6.1f} ns")
+
+    # Against a real frame: the worker times 4 stages per tick; one meter pass over 100 sessions
+    from audio_backend import SimulatedBackend
+    from meters import MeterSampler
+
+    backend = SimulatedBackend()
+    sampler = MeterSampler(backend.get_peak)
+    for i, session in enumerate(backend.populate(100)):
+        sampler.add(f'program{i}', session)
+    start = time.perf_counter()
+    for _ in range(1000):
+        backend.advance(1 / 60)
+        sampler.sample(backend.now)
+    frame = (time.perf_counter() - start) / 1000
+    overhead = 4 * results[False][0] / runs
+    print(f"disabled overhead per tick: {overhead * 1e9:.0f} ns, "
+          f"{overhead / frame * 100:.2f}% of a 100-session meter frame ({frame * 1e6:.1f} us)")
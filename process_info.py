@@ -0,0 +1,309 @@
+import threading
+from collections import OrderedDict
+
+import psutil
+
+# Everything ProcessInfo holds, read for every process in one process_iter pass
+SNAPSHOT_ATTRS = ['pid', 'create_time', 'name', 'exe', 'ppid']
+
+# Processes that host audio for whatever started them rather than being the program themselves
+HELPER_PROCESSES = {
+    'msedgewebview2.exe', 'cefsharp.browsersubprocess.exe', 'qtwebengineprocess.exe', 'qtwebengineprocess',
+    'web content', 'isolated web co', 'utility process', 'rdd process',  # Firefox content processes on Linux
+}
+# Never an application of their own; a helper they started stays on its own
+SYSTEM_PROCESSES = {
+    'explorer.exe', 'svchost.exe', 'services.exe', 'wininit.exe', 'winlogon.exe', 'sihost.exe',
+    'runtimebroker.exe', 'dllhost.exe', 'systemd', 'init', 'launchd',
+}
+MAX_DEPTH = 32
+
+
+class ProcessInfo:
+    """What the mixer needs to know about a process, resolved once per process lifetime."""
+
+    __slots__ = ('pid', 'create_time', 'name', 'exe', 'ppid', 'app')
+
+    def __init__(self, pid, create_time, name, exe, ppid):
+        self.pid = pid
+        self.create_time = create_time
+        self.name = name  # lowercased, e.g. 'spotify.exe'
+        self.exe = exe
+        self.ppid = ppid
+        self.app = None  # ProcessInfo of the application it belongs to, once ProcessCache.application() knows
+
+    def __repr__(self):
+        return f"<ProcessInfo {self.name} pid={self.pid}>"
+
+
+def belongs_to(child, parent):
+    """True if child is part of parent's application: another process of the same program, or a helper."""
+    if parent.name in SYSTEM_PROCESSES:
+        return False
+    return child.name == parent.name or child.name in HELPER_PROCESSES
+
+
+class ProcessCache:
+    """Process identity cache keyed by (pid, create_time), so a reused pid is never confused.
+
+    While a pid has live sessions it is answered from memory without touching
+    psutil at all. Once its last session is released, the entry only survives
+    in a bounded LRU; a later lookup of that pid costs one psutil.Process() to
+    read the create time, and name/exe/ppid are only resolved again if the
+    process is actually a new one.
+
+    When many sessions turn up at once, as in the first enumeration, take a
+    snapshot() first and pass it to acquire(): every process is then read in
+    a single process_iter pass and a pid it covers costs no psutil call.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.psutil_calls = 0
+        self._live = {}  # pid -> [ProcessInfo, live session count]
+        self._recent = OrderedDict()  # (pid, create_time) -> ProcessInfo
+        self._by_pid = {}  # pid -> newest ProcessInfo in _recent, to find parents by ppid
+        self._lock = threading.Lock()  # Session callbacks arrive on COM threads
+
+    def snapshot(self):
+        """Every running process as {pid: {attr: value}} for acquire(), from one process_iter pass."""
+        snapshot = {}
+        for process in psutil.process_iter(SNAPSHOT_ATTRS):  # Each process is read under oneshot()
+            snapshot[process.info['pid']] = process.info
+        with self._lock:
+            self.psutil_calls += 1
+        return snapshot
+
+    def acquire(self, pid, snapshot=None):
+        """Return the ProcessInfo for pid and count one more session for it, or None if it is gone."""
+        with self._lock:
+            live = self._live.get(pid)
+            if live is not None:
+                live[1] += 1
+                self.hits += 1
+                return live[0]
+        try:
+            info = self._lookup(pid, snapshot)
+        except psutil.NoSuchProcess:
+            return None
+        with self._lock:
+            live = self._live.setdefault(pid, [info, 0])
+            live[1] += 1
+            return live[0]
+
+    def release(self, pid):
+        """Forget one session of pid; the pid stops being trusted once none are left."""
+        with self._lock:
+            live = self._live.get(pid)
+            if live is not None:
+                live[1] -= 1
+                if live[1] <= 0:
+                    del self._live[pid]
+
+    def application(self, info, snapshot=None):
+        """The top-level application a process belongs to; the process itself if it is one.
+
+        Parents are climbed while belongs_to() holds, so browser and Electron
+        renderers and embedded helpers end up at the program that started
+        them. Every process passed on the way remembers the answer, so a
+        process costs one walk of its depth, once, and an attribute read after.
+        """
+        chain = []
+        node = info
+        while node.app is None and len(chain) < MAX_DEPTH:
+            chain.append(node)
+            parent = self._parent(node, snapshot)
+            if parent is None or not belongs_to(node, parent):
+                break
+            node = parent
+        app = node.app or node
+        for node in chain:
+            node.app = app
+        return app
+
+    def _parent(self, info, snapshot):
+        ppid = info.ppid
+        if not ppid or ppid == info.pid:
+            return None
+        with self._lock:
+            parent = self._by_pid.get(ppid)
+        if parent is None or parent.create_time > info.create_time:
+            try:
+                parent = self._lookup(ppid, snapshot)
+            except psutil.Error:
+                return None
+        if parent.create_time > info.create_time:
+            return None  # The parent has exited and its pid now belongs to a newer process
+        return parent
+
+    def _lookup(self, pid, snapshot=None):
+        """ProcessInfo for pid, from the snapshot or psutil; raises psutil.NoSuchProcess if it is gone."""
+        attrs = snapshot.get(pid) if snapshot is not None else None
+        process = None
+        if attrs is not None:
+            key = (pid, attrs['create_time'])
+        else:
+            process = psutil.Process(pid)
+            key = (pid, process.create_time())
+        with self._lock:
+            if process is not None:
+                self.psutil_calls += 2
+            info = self._recent.get(key)
+            if info is not None:
+                self._recent.move_to_end(key)
+                self.hits += 1
+                return info
+        if process is None:
+            info = ProcessInfo(pid, key[1], (attrs['name'] or '').lower(), attrs['exe'] or '', attrs['ppid'])
+        else:
+            info = self._resolve(process, key)
+        with self._lock:
+            self.misses += 1
+            if process is not None:
+                self.psutil_calls += 3  # name, ppid and exe
+            info = self._recent.setdefault(key, info)
+            self._by_pid[pid] = info
+            if len(self._recent) > self.max_size:
+                _, evicted = self._recent.popitem(last=False)
+                if self._by_pid.get(evicted.pid) is evicted:
+                    del self._by_pid[evicted.pid]
+        return info
+
+    @staticmethod
+    def _resolve(process, key):
+        with process.oneshot():
+            name = process.name().lower()
+            ppid = process.ppid()
+            try:
+                exe = process.exe()
+            except (psutil.AccessDenied, psutil.ZombieProcess):
+                exe = ''
+        return ProcessInfo(key[0], key[1], name, exe, ppid)
+
+
+if __name__ == '__main__':
+    # Micro-benchmark on this machine's pids: cached lookups vs psutil.Process(pid).name() per tick
+    import sys
+    import time
+
+    pids = psutil.pids()
+    ticks = 20
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for pid in pids:
+            try:
+                psutil.Process(pid).name().lower()
+            except psutil.Error:
+                pass
+    uncached = time.perf_counter() - start
+
+    cache = ProcessCache(max_size=len(pids))
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for pid in pids:
+            if cache.acquire(pid) is not None:
+                cache.release(pid)  # Worst case: every session expires between ticks
+    churn = time.perf_counter() - start
+
+    for pid in pids:
+        cache.acquire(pid)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for pid in pids:
+            cache.acquire(pid)
+    live = time.perf_counter() - start
+
+    lookups = ticks * len(pids)
+    print(f"{len(pids)} pids x {ticks} ticks")
+    print(f"psutil.Process().name(): {uncached / lookups * 1e6:.2f} us/lookup")
+    print(f"cache, pid re-acquired:  {churn / lookups * 1e6:.2f} us/lookup")
+    print(f"cache, pid still live:   {live / lookups * 1e6:.2f} us/lookup")
+    print(f"hits={cache.hits} misses={cache.misses}")
+
+    # Discovery of 200 new sessions: one psutil.Process per session vs one bulk snapshot per cycle
+    import subprocess
+
+    children = []
+    if sys.platform != 'win32':
+        children = [subprocess.Popen(['sleep', '60']) for _ in range(200)]
+        session_pids = [child.pid for child in children]
+    else:
+        session_pids = [pids[i % len(pids)] for i in range(200)]
+    cycles = 20
+    process_count = len(psutil.pids())
+    try:
+        start = time.perf_counter()
+        for _ in range(cycles):
+            cache = ProcessCache()
+            for pid in session_pids:
+                cache.acquire(pid)
+        per_session = (time.perf_counter() - start) / cycles
+        per_session_calls = cache.psutil_calls
+
+        start = time.perf_counter()
+        for _ in range(cycles):
+            cache = ProcessCache()
+            snapshot = cache.snapshot()
+            for pid in session_pids:
+                cache.acquire(pid, snapshot)
+        bulk = (time.perf_counter() - start) / cycles
+        bulk_calls = cache.psutil_calls
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+    print(f"{len(session_pids)} sessions, {process_count} processes, per discovery cycle")
+    print(f"psutil.Process per session: {per_session * 1e3:7.2f} ms, {per_session_calls} psutil calls")
+    print(f"bulk snapshot:              {bulk * 1e3:7.2f} ms, {bulk_calls} process_iter pass")
+
+    # Parent grouping on a synthetic tree, then on every process on this machine
+    from app_rules import AppRules
+
+    tree = [  # pid, ppid, name, create_time
+        (1, 0, 'explorer.exe', 1), (10, 1, 'chrome.exe', 2), (11, 10, 'chrome.exe', 3),
+        (20, 1, 'Teams.exe', 2), (21, 20, 'msedgewebview2.exe', 3), (22, 21, 'msedgewebview2.exe', 4),
+        (30, 1, 'steam.exe', 2), (31, 30, 'steamwebhelper.exe', 3), (32, 30, 'game.exe', 4),
+        (40, 1, 'svchost.exe', 2), (41, 40, 'msedgewebview2.exe', 3),
+        (50, 60, 'msedgewebview2.exe', 3), (60, 1, 'Teams.exe', 5),  # 60 reused the pid of 50's dead parent
+    ]
+    snapshot = {pid: {'pid': pid, 'ppid': ppid, 'name': name, 'exe': '', 'create_time': t}
+                for pid, ppid, name, t in tree}
+    expected = {  # pid -> (application pid, program name)
+        11: (10, 'chrome'),  # Renderer rolls up into the browser
+        22: (20, 'Microsoft Teams'),  # WebView2 inside Teams
+        31: (31, 'Steam'),  # Its own rule wins; steam.exe itself is excluded
+        32: (32, 'game'),  # A game started by a launcher stays itself
+        41: (41, 'msedgewebview2'),  # Hosted by a system process, so not rolled up
+        50: (50, 'msedgewebview2'),  # Parent pid reused by a younger process, not followed
+    }
+    cache = ProcessCache()
+    rules = AppRules.from_settings({})
+    for pid, (app_pid, program_name) in expected.items():
+        info = cache.acquire(pid, snapshot)
+        app = cache.application(info, snapshot)
+        name = rules.program_name(info.name, app.name)
+        print(f"{info.name:20s} pid {pid:2d} -> {app.name:12s} pid {app.pid:2d}: {name}")
+        assert (app.pid, name) == (app_pid, program_name), (pid, app.pid, name)
+
+    # A python that starts a python, so a real tree has something to roll up
+    nested = "import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); time.sleep(60)"
+    subprocess.Popen([sys.executable, '-c', nested])
+    time.sleep(0.5)
+    cache = ProcessCache(max_size=4096)
+    snapshot = cache.snapshot()
+    for child in psutil.Process().children(recursive=True):
+        child.kill()
+    infos = [cache.acquire(pid, snapshot) for pid in snapshot]
+    start = time.perf_counter()
+    apps = [cache.application(info, snapshot) for info in infos]
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for info in infos:
+        cache.application(info, snapshot)
+    memoized = time.perf_counter() - start
+    rolled = sum(app is not info for info, app in zip(infos, apps))
+    print(f"{len(infos)} processes, {rolled} rolled up into their application: "
+          f"first walk {first / len(infos) * 1e6:.2f} us/process, memoized {memoized / len(infos) * 1e6:.2f} us/process")
@@ -0,0 +1,465 @@
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView, QFrame
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QBrush, QFont
+
+import theme
+from perf import profiler
+
+ProgramRole = Qt.UserRole  # The row's Program itself, so paint() makes one data() call
+LevelRole = Qt.UserRole + 1  # (level, peak); changes to it only need the meter repainted
+
+
+class Program:
+    __slots__ = ('name', 'volume', 'muted', 'level', 'peak')
+
+    def __init__(self, name, volume):
+        self.name = name
+        self.volume = volume  # 0-100
+        self.muted = False
+        self.level = 0  # Meter level and held peak, 0-100
+        self.peak = 0
+
+
+class ProgramListModel(QAbstractListModel):
+    """Programs in display order with their volume, mute state and meter.
+
+    Setters only touch rows whose shown value changed and announce them as one
+    dataChanged span per call, so the view repaints at most the visible part
+    of that span no matter how many programs there are.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.programs = []
+        self.rows = {}  # program name -> row
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.programs)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        program = self.programs[index.row()]
+        if role == ProgramRole:
+            return program
+        if role == LevelRole:
+            return program.level, program.peak
+        if role == Qt.DisplayRole:
+            return program.name
+        return None
+
+    def add_programs(self, programs):
+        """Append [(program name, volume)], skipping names already listed."""
+        added = {}
+        for program_name, volume in programs:
+            if program_name not in self.rows:
+                added.setdefault(program_name, volume)
+        if not added:
+            return
+        first = len(self.programs)
+        self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+        for program_name, volume in added.items():
+            self.rows[program_name] = len(self.programs)
+            self.programs.append(Program(program_name, volume))
+        self.endInsertRows()
+        profiler.count('rows_created', len(added))
+
+    def remove_programs(self, program_names):
+        """Remove programs by name, bottom up, one rowsRemoved per run of adjacent rows, then reindex once."""
+        rows = sorted({self.rows.pop(name) for name in program_names if name in self.rows}, reverse=True)
+        if not rows:
+            return
+        i = 0
+        while i < len(rows):
+            first = last = rows[i]
+            i += 1
+            while i < len(rows) and rows[i] == first - 1:
+                first = rows[i]
+                i += 1
+            # Rows below the run are renumbered once at the end; nothing reads self.rows while this runs
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.programs[first:last + 1]
+            self.endRemoveRows()
+        for row in range(rows[-1], len(self.programs)):
+            self.rows[self.programs[row].name] = row
+
+    def set_volume(self, program_name, volume):
+        """Set one volume; returns True if it changed."""
+        row = self.rows.get(program_name)
+        if row is None or self.programs[row].volume == volume:
+            return False
+        self.programs[row].volume = volume
+        self._changed(row, row)
+        return True
+
+    def set_volumes(self, volumes, skip=None):
+        """Apply {program name: volume}, leaving the program named `skip` alone."""
+        first = last = None
+        for program_name, volume in volumes.items():
+            row = self.rows.get(program_name)
+            if row is None or program_name == skip:
+                continue
+            program = self.programs[row]
+            if program.volume != volume:
+                program.volume = volume
+                first, last = self._span(first, last, row)
+        if first is not None:
+            self._changed(first, last)
+
+    def set_muted(self, program_name, muted):
+        row = self.rows.get(program_name)
+        if row is not None and self.programs[row].muted != muted:
+            self.programs[row].muted = muted
+            self._changed(row, row)
+
+    def set_levels(self, frame):
+        """Apply {program name: (level, peak)} for one meter frame, levels 0..1."""
+        first = last = None
+        programs = self.programs
+        for program_name, (level, peak) in frame.items():
+            row = self.rows.get(program_name)
+            if row is None:
+                continue
+            program = programs[row]
+            level = int(level * 100)
+            peak = int(peak * 100)
+            if program.level != level or program.peak != peak:
+                program.level = level
+                program.peak = peak
+                first, last = self._span(first, last, row)
+        if first is not None:
+            self._changed(first, last, LevelRole)
+
+    @staticmethod
+    def _span(first, last, row):
+        if first is None:
+            return row, row
+        return min(first, row), max(last, row)
+
+    def _changed(self, first, last, role=ProgramRole):
+        self.dataChanged.emit(self.index(first), self.index(last), [role])
+
+
+class ProgramDelegate(QStyledItemDelegate):
+    """Paints a program row: label, mute button, volume slider and level meter.
+
+    Every part sits at a fixed spot in a fixed-size row, so the view hit tests
+    clicks against the same rects the painter uses.
+    """
+
+    ROW_HEIGHT = 40
+    WIDTH = 460
+    LABEL = QRect(5, 5, 120, 30)
+    MUTE = QRect(125, 5, 30, 30)
+    SLIDER = QRect(155, 5, 200, 30)
+    GROOVE = QRect(155, 16, 200, 8)
+    HANDLE_WIDTH = 15
+    METER = QRect(365, 5, 80, 30)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.dirty = None  # Region being repainted, set by the view
+        self.label_brush = QBrush(theme.LABEL_BACKGROUND)
+        self.label_pen = QPen(theme.LABEL_TEXT)
+        self.label_font = QFont()
+        self.label_font.setBold(True)
+        self.label_font.setPixelSize(15)
+        self.mute_brush = QBrush(theme.MUTE_BUTTON)
+        self.muted_brush = QBrush(theme.MUTE_BUTTON_MUTED)
+        self.mute_pen = QPen(theme.MUTE_TEXT)
+        self.groove_pen = QPen(theme.SLIDER_BORDER)
+        self.groove_brush = QBrush(theme.SLIDER_GROOVE)
+        self.handle_brush = QBrush(theme.SLIDER_HANDLE)
+        self.meter_pen = QPen(theme.METER_BORDER)
+        self.meter_brush = QBrush(theme.METER_BACKGROUND)
+        self.level_brush = QBrush(theme.METER_LEVEL)
+        self.peak_pen = QPen(theme.METER_PEAK, 2)
+
+    def sizeHint(self, option, index):
+        return QSize(self.WIDTH, self.ROW_HEIGHT)
+
+    def slider_value(self, x):
+        """Volume for a press or drag at x, in row coordinates."""
+        span = self.GROOVE.width() - self.HANDLE_WIDTH
+        value = round((x - self.GROOVE.x() - self.HANDLE_WIDTH / 2) * 100 / span)
+        return min(max(value, 0), 100)
+
+    def paint(self, painter, option, index):
+        program = index.data(ProgramRole)
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        if self.dirty is None or self.dirty.left() < option.rect.x() + self.METER.x():
+            self.paint_controls(painter, program)
+        self.paint_meter(painter, program)
+        painter.restore()
+
+    def paint_controls(self, painter, program):
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.label_brush)
+        painter.drawRoundedRect(self.LABEL, 5, 5)
+        painter.setPen(self.label_pen)
+        painter.setFont(self.label_font)
+        painter.drawText(self.LABEL.adjusted(5, 0, -5, 0),
+                         Qt.AlignLeft | Qt.AlignVCenter | Qt.TextWordWrap, program.name)
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.muted_brush if program.muted else self.mute_brush)
+        painter.drawEllipse(self.MUTE)
+        painter.setPen(self.mute_pen)
+        painter.drawText(self.MUTE, Qt.AlignCenter, "M")
+
+        painter.setPen(self.groove_pen)
+        painter.setBrush(self.groove_brush)
+        painter.drawRect(self.GROOVE)
+        handle_x = self.GROOVE.x() + program.volume * (self.GROOVE.width() - self.HANDLE_WIDTH) // 100
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.handle_brush)
+        painter.drawRoundedRect(QRect(handle_x, self.GROOVE.y() - 2, self.HANDLE_WIDTH, self.GROOVE.height() + 4), 6, 6)
+        painter.setRenderHint(QPainter.Antialiasing, False)
+
+    def paint_placeholder(self, painter):
+        rect = QRect(self.LABEL.x(), self.LABEL.y(), self.WIDTH - 2 * self.LABEL.x(), self.LABEL.height())
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.label_brush)
+        painter.drawRoundedRect(rect, 5, 5)
+        painter.setPen(self.label_pen)
+        painter.setFont(self.label_font)
+        painter.drawText(rect, Qt.AlignCenter, "No programs are playing audio")
+
+    def paint_meter(self, painter, program):
+        meter = self.METER
+        painter.setPen(self.meter_pen)
+        painter.setBrush(self.meter_brush)
+        painter.drawRect(meter.adjusted(0, 0, -1, -1))
+        inner = meter.width() - 2
+        if program.level:
+            painter.fillRect(meter.x() + 1, meter.y() + 1, program.level * inner // 100, meter.height() - 2,
+                             self.level_brush)
+        if program.peak:
+            painter.setPen(self.peak_pen)
+            x = meter.x() + 1 + program.peak * inner // 100
+            painter.drawLine(x, meter.y() + 1, x, meter.bottom() - 1)
+
+
+class ProgramListView(QListView):
+    """Scrolling list of programs; only rows on screen are ever painted.
+
+    Emits the same signals a row of real widgets did. Presses outside the mute
+    button and slider are ignored so they fall through to the window, which
+    uses them to drag itself around.
+    """
+
+    volume_changed = pyqtSignal(str, int)
+    volume_committed = pyqtSignal(str, int)
+    mute_clicked = pyqtSignal(str)
+
+    def __init__(self, max_visible_rows=12, parent=None):
+        super().__init__(parent)
+        self.max_visible_rows = max_visible_rows
+        self.dragging = None  # Program whose slider is held down
+        self.delegate = ProgramDelegate(self)
+        self.setObjectName('programList')
+        self.setItemDelegate(self.delegate)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setFrameShape(QFrame.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.viewport().setAutoFillBackground(False)
+        self.fit_rows()
+
+    def setModel(self, model):
+        super().setModel(model)
+        model.rowsInserted.connect(self.fit_rows)
+        model.rowsRemoved.connect(self.fit_rows)
+        model.modelReset.connect(self.fit_rows)
+        self.fit_rows()
+
+    def dataChanged(self, top_left, bottom_right, roles=[]):
+        # QListView relays out every item on dataChanged in case sizes moved;
+        # ours never do, so only repaint
+        if list(roles) != [LevelRole]:
+            QAbstractItemView.dataChanged(self, top_left, bottom_right, roles)
+            return
+        # Meter frames repaint the meter column of the changed span and nothing else
+        top = self.visualRect(top_left).top()
+        bottom = self.visualRect(bottom_right).bottom()
+        meter = ProgramDelegate.METER
+        self.viewport().update(QRect(meter.x(), top, meter.width(), bottom - top + 1)
+                               .intersected(self.viewport().rect()))
+
+    def paintEvent(self, event):
+        if self.model() is None or not self.model().rowCount():
+            painter = QPainter(self.viewport())
+            self.delegate.paint_placeholder(painter)
+            painter.end()
+            return
+        self.delegate.dirty = event.rect()
+        with profiler.phase('list_paint'):
+            super().paintEvent(event)
+        self.delegate.dirty = None
+
+    def fit_rows(self):
+        """Grow with the program count up to max_visible_rows, then scroll.
+
+        An empty list keeps one row's height for the placeholder, so the
+        window can be shown and painted before any program turns up.
+        """
+        count = self.model().rowCount() if self.model() is not None else 0
+        width = ProgramDelegate.WIDTH
+        if count > self.max_visible_rows:
+            width += self.verticalScrollBar().sizeHint().width()
+        self.setFixedSize(width, min(max(count, 1), self.max_visible_rows) * ProgramDelegate.ROW_HEIGHT)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            index = self.indexAt(event.pos())
+            if index.isValid():
+                pos = event.pos() - self.visualRect(index).topLeft()
+                program = index.data(ProgramRole)
+                if ProgramDelegate.MUTE.contains(pos):
+                    self.mute_clicked.emit(program.name)
+                    event.accept()
+                    return
+                if ProgramDelegate.SLIDER.contains(pos):
+                    self.dragging = program.name
+                    self.drag_slider(event.pos())
+                    event.accept()
+                    return
+        event.ignore()
+
+    mouseDoubleClickEvent = mousePressEvent  # A quick second click counts as another click
+
+    def mouseMoveEvent(self, event):
+        if self.dragging is None:
+            event.ignore()
+            return
+        self.drag_slider(event.pos())
+        event.accept()
+
+    def mouseReleaseEvent(self, event):
+        if self.dragging is None:
+            event.ignore()
+            return
+        program_name = self.dragging
+        self.dragging = None
+        row = self.model().rows.get(program_name)
+        if row is not None:
+            self.volume_committed.emit(program_name, self.model().programs[row].volume)
+        event.accept()
+
+    def drag_slider(self, pos):
+        model = self.model()
+        row = model.rows.get(self.dragging)
+        if row is None:
+            return  # The program went away mid-drag
+        x = pos.x() - self.visualRect(model.index(row)).x()
+        value = self.delegate.slider_value(x)
+        if model.set_volume(self.dragging, value):
+            self.volume_changed.emit(self.dragging, value)
+
+
+if __name__ == '__main__':
+    # Offscreen: relayout (adding every program) and per-frame update time, widget rows vs model/view
+    import math
+    import os
+    import sys
+    import time
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QEvent
+    from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                                 QSlider, QProgressBar)
+
+    def frames(count, frame_count=60):
+        # Every third program is silent; a few volumes move every tenth frame
+        for f in range(frame_count):
+            levels = {f'program{i}': (abs(math.sin(f / 10 + i)), abs(math.sin(f / 30 + i))) if i % 3 else (0.0, 0.0)
+                      for i in range(count)}
+            volumes = {f'program{(f * 7 + k) % count}': (f + k) % 101 for k in range(3)} if f % 10 == 0 else {}
+            yield levels, volumes
+
+    def widget_rows(window, layout, names):
+        rows = {}
+        for name in names:
+            row = QWidget()
+            hbox = QHBoxLayout(row)
+            hbox.setContentsMargins(5, 5, 5, 5)
+            hbox.setSpacing(0)
+            label = QLabel(name)
+            label.setFixedSize(120, 30)
+            button = QPushButton("M")
+            button.setFixedSize(30, 30)
+            slider = QSlider(Qt.Horizontal)
+            slider.setFixedSize(200, 30)
+            bar = QProgressBar()
+            bar.setTextVisible(False)
+            bar.setFixedSize(100, 30)
+            for widget in (label, button, slider, bar):
+                hbox.addWidget(widget)
+            layout.addWidget(row)
+            rows[name] = (slider, bar)
+
+        def update(levels, volumes):
+            for name, (level, peak) in levels.items():
+                rows[name][1].setValue(int(level * 100))
+            for name, volume in volumes.items():
+                rows[name][0].setValue(volume)
+        return update
+
+    def model_view(window, layout, names):
+        model = ProgramListModel(window)
+        view = ProgramListView()
+        view.setModel(model)
+        layout.addWidget(view)
+        model.add_programs([(name, 50) for name in names])
+
+        def update(levels, volumes):
+            model.set_levels(levels)
+            model.set_volumes(volumes)
+        return update
+
+    app = QApplication(sys.argv)
+    theme.install(app)
+    variants = (('widget rows', widget_rows), ('model/view', model_view))
+    for count in (10, 100, 1000):
+        names = [f'program{i}' for i in range(count)]
+        frame_list = list(frames(count))
+        for label, build in variants:
+            window = QWidget()
+            layout = QVBoxLayout(window)
+            window.show()
+            app.processEvents()
+            start = time.perf_counter()
+            update = build(window, layout, names)
+            app.processEvents()
+            relayout = time.perf_counter() - start
+            start = time.perf_counter()
+            for levels, volumes in frame_list:
+                update(levels, volumes)
+                app.processEvents()
+            updating = (time.perf_counter() - start) / len(frame_list)
+            print(f"{count:5d} programs, {label:11s}: relayout {relayout * 1e3:8.1f} ms, "
+                  f"update {updating * 1e3:.3f} ms/frame")
+            window.deleteLater()
+            app.sendPostedEvents(None, QEvent.DeferredDelete)
+
+    # Half of 5000 programs going away at once, scattered through the list
+    import random
+
+    model = ProgramListModel()
+    view = ProgramListView()
+    view.setModel(model)
+    names = [f'program{i}' for i in range(5000)]
+    model.add_programs([(name, 50) for name in names])
+    gone = set(random.Random(0).sample(names, 2500))
+    start = time.perf_counter()
+    model.remove_programs(gone)
+    elapsed = time.perf_counter() - start
+    assert [program.name for program in model.programs] == [name for name in names if name not in gone]
+    assert len(model.rows) == 2500 and all(model.programs[row].name == name for name, row in model.rows.items())
+    assert view.height() == view.max_visible_rows * ProgramDelegate.ROW_HEIGHT
+    print(f"2500 of 5000 programs removed in {elapsed * 1e3:.1f} ms")
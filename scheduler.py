@@ -0,0 +1,125 @@
+SHOWN = 'shown'
+MINIMIZED = 'minimized'
+HIDDEN = 'hidden'
+TRAY = 'tray'
+STATES = (SHOWN, MINIMIZED, HIDDEN, TRAY)
+
+
+class AdaptiveScheduler:
+    """Decides when the audio worker next runs a frame and polls for sessions.
+
+    Frames (volume write flushes and meter samples) run at `frame_period`
+    while the window is shown; otherwise only while writes are pending, and
+    meters are not sampled at all. Discovery starts at `discovery_period` and
+    doubles after every poll that finds nothing, up to `max_discovery_period`.
+    A change, wake() or showing the window brings it straight back.
+    """
+
+    def __init__(self, frame_period, discovery_period, max_discovery_period=30.0, now=0.0):
+        self.frame_period = frame_period
+        self.discovery_period = discovery_period
+        self.max_discovery_period = max_discovery_period
+        self.state = SHOWN
+        self.next_frame = now
+        self.next_discovery = now
+        self.discovery_backoff = discovery_period
+        self.stats = {state: {'seconds': 0.0, 'meter_samples': 0, 'discovery_polls': 0} for state in STATES}
+        self._state_since = now
+
+    def set_visibility(self, state, now):
+        if state not in STATES:
+            raise ValueError(f"Unknown visibility state: {state}")
+        self._account(now)
+        self.state = state
+        if state == SHOWN:
+            self.next_frame = now
+            self.wake(now)
+
+    def wake(self, now):
+        """Poll for sessions now and go back to the fastest discovery rate."""
+        self.discovery_backoff = self.discovery_period
+        self.next_discovery = now
+
+    def next_deadline(self, writes_pending=False):
+        if self.state == SHOWN or writes_pending:
+            return min(self.next_frame, self.next_discovery)
+        return self.next_discovery
+
+    def frame_due(self, now, writes_pending=False):
+        """True when a frame should run now; sample meters too if meters_visible."""
+        if (self.state != SHOWN and not writes_pending) or now < self.next_frame:
+            return False
+        if self.state == SHOWN:
+            self.stats[SHOWN]['meter_samples'] += 1
+        self.next_frame += self.frame_period
+        if self.next_frame < now:
+            self.next_frame = now + self.frame_period  # Skip frames rather than burst
+        return True
+
+    @property
+    def meters_visible(self):
+        return self.state == SHOWN
+
+    def discovery_due(self, now):
+        if now < self.next_discovery:
+            return False
+        self.stats[self.state]['discovery_polls'] += 1
+        return True
+
+    def discovered(self, changed, now):
+        """Record the result of a poll and schedule the next one."""
+        if changed:
+            self.discovery_backoff = self.discovery_period
+        else:
+            self.discovery_backoff = min(self.discovery_backoff * 2, self.max_discovery_period)
+        self.next_discovery = now + self.discovery_backoff
+
+    def report(self, now):
+        """Calls avoided per hour in each state, against fixed-rate meters and discovery.
+
+        Only reads, so the profiler can call it from the GUI thread while the worker runs.
+        """
+        report = {}
+        for state, stats in self.stats.items():
+            seconds = stats['seconds']
+            if state == self.state:
+                seconds += now - self._state_since
+            if not seconds:
+                continue
+            hours = seconds / 3600
+            meter_avoided = max(0.0, seconds / self.frame_period - stats['meter_samples'])
+            discovery_avoided = max(0.0, seconds / self.discovery_period - stats['discovery_polls'])
+            report[state] = {
+                'seconds': round(seconds, 1),
+                'meter_avoided_per_hour': round(meter_avoided / hours),
+                'discovery_avoided_per_hour': round(discovery_avoided / hours),
+            }
+        return report
+
+    def _account(self, now):
+        self.stats[self.state]['seconds'] += now - self._state_since
+        self._state_since = now
+
+
+if __name__ == '__main__':
+    # One simulated hour: 10 min shown, 35 in the tray, 5 minimized, 10 shown, with a session change every few minutes
+    import random
+
+    scheduler = AdaptiveScheduler(1 / 30, 1.0)
+    timeline = [(600, SHOWN), (2100, TRAY), (300, MINIMIZED), (600, SHOWN)]
+    changes = random.Random(0)
+    now = 0.0
+    for duration, state in timeline:
+        scheduler.set_visibility(state, now)
+        end = now + duration
+        while True:
+            now = scheduler.next_deadline()
+            if now >= end:
+                now = end
+                break
+            if scheduler.discovery_due(now):
+                scheduler.discovered(changes.random() < 0.02, now)
+            scheduler.frame_due(now)
+    for state, stats in scheduler.report(now).items():
+        print(f"{state:9s} {stats['seconds']:7.0f} s: {stats['meter_avoided_per_hour']:6d} meter samples and "
+              f"{stats['discovery_avoided_per_hour']:5d} discovery polls avoided per hour")
@@ -0,0 +1,142 @@
+"""Soak test: thousands of programs appearing and going away, checking that nothing piles up.
+
+Runs the real window and audio worker on the simulated backend, from a
+scratch directory so the real settings.json and app_state.json are left
+alone. Sessions come and go, start and stop playing and change volume,
+all from a fixed pool of program names, so every cache keyed by name fills
+up during warm-up. After that, RSS, Python objects, live TrackedSessions,
+Qt widgets and the worker's tables must stay flat; the exit code is 1 if
+any of them grew.
+
+    python soak.py [--cycles 2000] [--churn 5]
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NAMES = [f'program{i}.exe' for i in range(40)]
+OBJECT_TOLERANCE = 0.01  # Share of Python objects that may come and go with the program mix
+RSS_TOLERANCE_MB = 4.0
+
+
+def settle(app, mixer, backend, timeout=5.0):
+    """Pump events until the worker has caught up with every session change."""
+    from PyQt5.QtCore import QEventLoop
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents(QEventLoop.AllEvents, 5)
+        tracker = mixer.worker.tracker
+        if not tracker._events and tracker.sessions.keys() == backend.sessions.keys():
+            app.processEvents(QEventLoop.AllEvents, 5)
+            return
+    raise TimeoutError("The worker did not catch up with the simulated sessions")
+
+
+def measure(app, mixer, backend):
+    import psutil
+    from audio_sessions import TrackedSession
+
+    settle(app, mixer, backend)
+    rss = psutil.Process().memory_info().rss
+    gc.collect()
+    objects = gc.get_objects()
+    worker = mixer.worker
+    return {
+        'rss_mb': rss / 2 ** 20,
+        'objects': len(objects),
+        # Not isinstance(): reading __class__ makes sip fill in PyQt's lazy type dicts, thousands of objects
+        'tracked_sessions': sum(type(o) is TrackedSession for o in objects) - len(backend.sessions),
+        'widgets': len(app.allWidgets()),
+        'rows': mixer.program_model.rowCount(),
+        'programs': len(worker.programs),
+        'session_keys': len(worker.session_programs) - len(backend.sessions),
+        'meters': len(worker.meter_sampler.meters),
+    }
+
+
+def check(baseline, final):
+    """Names of the measurements that grew beyond noise."""
+    grew = []
+    if final['objects'] > baseline['objects'] * (1 + OBJECT_TOLERANCE):
+        grew.append('objects')
+    if final['rss_mb'] > baseline['rss_mb'] + RSS_TOLERANCE_MB:
+        grew.append('rss_mb')
+    for name in ('tracked_sessions', 'widgets', 'session_keys'):
+        if final[name] > baseline[name]:
+            grew.append(name)
+    for name in ('rows', 'programs', 'meters'):
+        if final[name] > len(NAMES):
+            grew.append(name)
+    return grew
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Churn simulated sessions and check for leaks.")
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--churn', type=int, default=5, help="sessions replaced per cycle")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, HERE)
+    directory = tempfile.mkdtemp()
+    working_directory = os.getcwd()
+    os.chdir(directory)
+    try:
+        with open('settings.json', 'w') as f:
+            json.dump({'audio_backend': 'simulated', 'control_server': ''}, f)
+        from PyQt5.QtCore import QEventLoop
+        from PyQt5.QtWidgets import QApplication
+        from audio_backend import AudioBackend
+        from VolumeMixer import VolumeMixer
+
+        app = QApplication(sys.argv)
+        mixer = VolumeMixer()
+        mixer.show()
+        mixer.start_services()
+        while not isinstance(mixer.worker.backend, AudioBackend):
+            app.processEvents(QEventLoop.AllEvents, 5)
+        backend = mixer.worker.backend
+        backend.populate(20, NAMES)
+
+        start = time.perf_counter()
+        checkpoints = {}
+        warm_up = args.cycles // 4
+        for cycle in range(args.cycles + 1):
+            if cycle == warm_up or cycle == args.cycles or (cycle > warm_up and cycle % (args.cycles // 8 or 1) == 0):
+                checkpoints[cycle] = measure(app, mixer, backend)
+                print(f"cycle {cycle:6d}: " + ", ".join(f"{name} {value:.1f}" if isinstance(value, float)
+                                                      else f"{name} {value}"
+                                                      for name, value in checkpoints[cycle].items()), flush=True)
+            if cycle == args.cycles:
+                break
+            for session in backend.churn(args.churn, NAMES):
+                if backend.random.random() < 0.3:
+                    backend.set_active(session.key, False)
+            key = backend.random.choice(sorted(backend.sessions))
+            backend.change_volume(key, backend.random.random())
+            app.processEvents(QEventLoop.AllEvents, 1)
+        elapsed = time.perf_counter() - start
+        mixer.close()
+
+        grew = check(checkpoints[warm_up], checkpoints[args.cycles])
+        print(f"{args.cycles * args.churn} sessions added and removed in {elapsed:.1f} s")
+        if grew:
+            print("Grew after warm-up: " + ", ".join(grew))
+            return 1
+        print("Flat after warm-up")
+        return 0
+    finally:
+        os.chdir(working_directory)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
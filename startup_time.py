@@ -0,0 +1,80 @@
+"""Cold start of the GUI against the headless CLI, measured with python -X importtime.
+
+Each mode runs in a fresh interpreter on the simulated backend, from a
+scratch directory so neither touches the real settings.json. The GUI also
+reports its own startup marks, time to first paint and to first row.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+GUI = """
+import json
+import sys
+import time
+import VolumeMixer
+from PyQt5.QtCore import QEventLoop
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+mixer = VolumeMixer.VolumeMixer()
+mixer.show()
+deadline = time.monotonic() + 5
+while 'first_row' not in mixer.startup_marks and time.monotonic() < deadline:
+    app.processEvents(QEventLoop.AllEvents, 5)
+mixer.close()
+print('MARKS ' + json.dumps(mixer.startup_marks))
+"""
+
+
+def import_times(stderr):
+    """(total self time in ms, module count) from -X importtime output."""
+    total = 0
+    count = 0
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            self_time = line.split(':', 1)[1].split('|')[0].strip()
+            if self_time.isdigit():
+                total += int(self_time)
+                count += 1
+    return total / 1000, count
+
+
+def run(args, directory):
+    env = dict(os.environ, PYTHONPATH=HERE, QT_QPA_PLATFORM='offscreen')
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=directory, env=env,
+                            capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    marks = {}
+    for line in result.stdout.splitlines():
+        if line.startswith('MARKS '):
+            marks = json.loads(line[len('MARKS '):])
+    return elapsed, import_times(result.stderr), marks
+
+
+if __name__ == '__main__':
+    runs = 5
+    modes = (('GUI', ['-c', GUI]), ('CLI list', [os.path.join(HERE, 'mixer_cli.py'), 'list']))
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, 'settings.json'), 'w') as f:
+            json.dump({'audio_backend': 'simulated', 'control_server': ''}, f)
+        for label, args in modes:
+            results = [run(args, directory) for _ in range(runs)]
+            wall = statistics.median(elapsed for elapsed, _, _ in results)
+            imports = statistics.median(imported for _, (imported, _), _ in results)
+            modules = results[0][1][1]
+            print(f"{label:8s}: {wall:7.1f} ms wall, {imports:7.1f} ms importing {modules} modules "
+                  f"(median of {runs})")
+            for stage in ('first_paint', 'audio_started', 'first_row'):
+                times = [marks[stage] for _, _, marks in results if stage in marks]
+                if times:
+                    print(f"{'':10s}{stage}: {statistics.median(times):.1f} ms")
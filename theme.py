@@ -0,0 +1,39 @@
+"""Look of the mixer.
+
+The program list is painted by ProgramDelegate rather than built from styled
+widgets, so its colors live here as QColors the delegate turns into pens and
+brushes once. The stylesheet only covers the real widgets that remain.
+"""
+
+from PyQt5.QtGui import QColor
+
+LABEL_BACKGROUND = QColor('#333333')
+LABEL_TEXT = QColor('#FFFFFF')
+MUTE_BUTTON = QColor('#666666')
+MUTE_BUTTON_MUTED = QColor('red')
+MUTE_TEXT = QColor('white')
+SLIDER_BORDER = QColor('#999999')
+SLIDER_GROOVE = QColor('#B0C4DE')
+SLIDER_HANDLE = QColor('#FFFFFF')
+METER_BORDER = QColor('#999999')
+METER_BACKGROUND = QColor(224, 224, 224, 150)
+METER_LEVEL = QColor('#66CDAA')
+METER_PEAK = QColor('#2E8B57')
+
+STYLESHEET = """
+QListView#programList {
+    background: transparent;
+    border: none;
+}
+QLabel#perfOverlay {
+    background: rgba(0, 0, 0, 200);
+    color: #66CDAA;
+    font-family: monospace;
+    font-size: 9pt;
+    padding: 4px;
+}
+"""
+
+
+def install(app):
+    app.setStyleSheet(STYLESHEET)
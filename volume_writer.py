@@ -0,0 +1,64 @@
+from faults import RateLimitedLog
+
+
+class VolumeWriteCoalescer:
+    """Keeps only the newest pending volume per program and writes them in batches.
+
+    A slider drag produces one valueChanged per step; only the value that is
+    current when flush() runs (once per frame) reaches the audio API.
+    """
+
+    def __init__(self, write, errors=None):
+        self.write = write  # callable(program name, value 0-100)
+        self.errors = errors or RateLimitedLog()
+        self.pending = {}
+        self.writes = 0
+
+    def set(self, program_name, value):
+        self.pending[program_name] = value
+
+    def discard(self, program_name):
+        self.pending.pop(program_name, None)
+
+    def flush(self, program_name=None):
+        """Write pending values, all of them or just the one for program_name."""
+        if program_name is not None:
+            if program_name in self.pending:
+                self._write(program_name, self.pending.pop(program_name))
+            return
+        pending = self.pending
+        self.pending = {}
+        for name, value in pending.items():
+            self._write(name, value)
+
+    def _write(self, program_name, value):
+        self.writes += 1
+        try:
+            self.write(program_name, value)
+        except Exception as e:
+            self.errors.warning('volume_write_failed', program_name, value=value, error=type(e).__name__, detail=e)
+
+
+if __name__ == '__main__':
+    # Scripted drag: 0 -> 100 over 500 ms of 1 ms mouse events, flushed at 60 Hz
+    from audio_backend import SimulatedBackend
+
+    backend = SimulatedBackend()
+    session = backend.add_session('spotify.exe')
+    coalescer = VolumeWriteCoalescer(lambda name, value: backend.set_volume(session, value / 100))
+    frame = 1000 / 60
+    next_flush = frame
+    frames = 0
+    for ms in range(501):
+        coalescer.set('Spotify', ms // 5)
+        if ms >= next_flush:
+            writes = backend.volume_writes
+            coalescer.flush()
+            assert backend.volume_writes - writes <= 1, "more than one write in a frame"
+            frames += 1
+            next_flush += frame
+    coalescer.set('Spotify', 100)
+    coalescer.flush('Spotify')  # sliderReleased
+    assert backend.volume_writes <= frames + 1, (backend.volume_writes, frames)
+    assert backend.get_volume(session) == 1.0
+    print(f"101 slider values -> {backend.volume_writes} volume writes, final {backend.get_volume(session):.2f}")